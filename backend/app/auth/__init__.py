@@ -4,6 +4,8 @@ from .utils import (
     validate_super_admin,
     validate_site_admin,
     create_access_token,
+    create_public_form_token,
+    decode_public_form_token,
     get_password_hash,
     verify_password
 )
@@ -18,6 +18,7 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+PUBLIC_FORM_TOKEN_TYPE = "public_form"
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -46,6 +47,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_public_form_token(form_id: int, site_id: int, form_version: int, expires_delta: timedelta) -> str:
+    """Create a signed token allowing anonymous submissions to a form version."""
+    to_encode = {
+        "typ": PUBLIC_FORM_TOKEN_TYPE,
+        "form_id": form_id,
+        "site_id": site_id,
+        "ver": form_version,
+        "exp": datetime.utcnow() + expires_delta
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_public_form_token(token: str) -> dict:
+    """Validate a public form token without touching the database."""
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired form link"
+    )
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise invalid_token_exception
+
+    if payload.get("typ") != PUBLIC_FORM_TOKEN_TYPE or payload.get("form_id") is None:
+        raise invalid_token_exception
+
+    return payload
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()
@@ -12,6 +13,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Replay retried writes sent with an Idempotency-Key (added first so CORS wraps replays)
+from app.services.idempotency import IdempotencyMiddleware
+
+app.add_middleware(IdempotencyMiddleware)
+
+# Cut off oversized multipart uploads while they are received, before they are spooled
+from app.services.uploads import UploadLimitMiddleware
+
+app.add_middleware(UploadLimitMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -21,10 +32,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for uploads
-uploads_dir = os.getenv("UPLOAD_DIR", "./uploads")
-os.makedirs(uploads_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names are content hashes, cacheable forever."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Mount published form definitions
+form_snapshots_dir = os.getenv("FORM_SNAPSHOT_DIR", "./static/forms")
+os.makedirs(form_snapshots_dir, exist_ok=True)
+app.mount("/static/forms", ImmutableStaticFiles(directory=form_snapshots_dir), name="form_snapshots")
+
+@app.on_event("startup")
+def create_upcoming_partitions():
+    # Make sure form_responses always has partitions for the coming months
+    from app.database import SessionLocal
+    from app.services.partitions import ensure_partitions
+
+    db = SessionLocal()
+    try:
+        ensure_partitions(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_draft_flusher():
+    # Persist buffered draft autosaves in the background
+    from app.services.drafts import draft_buffer
+
+    app.state.draft_flusher = asyncio.create_task(draft_buffer.run())
+
+@app.on_event("shutdown")
+async def stop_draft_flusher():
+    # Cancelling flushes whatever is still buffered
+    app.state.draft_flusher.cancel()
+    try:
+        await app.state.draft_flusher
+    except asyncio.CancelledError:
+        pass
+
+@app.on_event("startup")
+async def start_storage_reconciler():
+    # Reclaim files of deleted rows in the background; one worker runs at a time
+    from app.services.storage_gc import STORAGE_GC_INTERVAL, run_periodically
+
+    app.state.storage_reconciler = None
+    if STORAGE_GC_INTERVAL > 0:
+        app.state.storage_reconciler = asyncio.create_task(run_periodically())
+
+@app.on_event("shutdown")
+async def stop_storage_reconciler():
+    if app.state.storage_reconciler:
+        app.state.storage_reconciler.cancel()
+
+@app.on_event("shutdown")
+def stop_image_workers():
+    # Images still queued are rendered when first requested
+    from app.services.images import derivative_pool
+
+    derivative_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -35,10 +103,15 @@ async def root():
     }
 
 # Import and include routers after all middleware and configurations
-from app.routers import auth, users, sites, forms, messages
+from app.routers import auth, users, sites, forms, messages, public, changes, uploads, files, storage
 
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(sites.router, prefix="/api/sites", tags=["Sites"])
 app.include_router(forms.router, prefix="/api/forms", tags=["Forms"])
 app.include_router(messages.router, prefix="/api/messages", tags=["Messages"])
+app.include_router(public.router, prefix="/api/public", tags=["Public Forms"])
+app.include_router(changes.router, prefix="/api/changes", tags=["Changes"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["Uploads"])
+app.include_router(files.router, prefix="/api/files", tags=["Files"])
+app.include_router(storage.router, prefix="/api/storage", tags=["Storage"])
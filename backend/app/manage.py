@@ -0,0 +1,157 @@
+"""Maintenance commands.
+
+Usage:
+    python -m backend.app.manage partitions ensure [--months-ahead N]
+    python -m backend.app.manage partitions list
+    python -m backend.app.manage partitions archive --older-than MONTHS [--dry-run]
+    python -m backend.app.manage partitions restore NAME
+    python -m backend.app.manage changes compact [--retention-days N] [--tombstone-days N] [--dry-run]
+    python -m backend.app.manage idempotency purge [--dry-run]
+    python -m backend.app.manage uploads expire [--dry-run]
+    python -m backend.app.manage storage gc [--grace-hours N] [--dry-run]
+    python -m backend.app.manage storage migrate-layout [--batch-size N] [--dry-run]
+    python -m backend.app.manage storage tier [--cold-after-days N] [--dry-run]
+"""
+import argparse
+import sys
+
+from .database import SessionLocal
+from .services import partitions, changes, idempotency, resumable_uploads, storage_gc, storage_layout, tiering
+
+
+def partitions_command(args) -> int:
+    db = SessionLocal()
+    try:
+        if args.action == "ensure":
+            count = partitions.ensure_partitions(db, args.months_ahead)
+            print(f"Ensured {count} monthly partitions")
+        elif args.action == "list":
+            for name in partitions.list_partitions(db):
+                print(name)
+        elif args.action == "archive":
+            if args.older_than is None:
+                print("--older-than is required for archive")
+                return 1
+            archived = partitions.archive_partitions(db, args.older_than, args.archive_dir, args.dry_run)
+            prefix = "Would archive" if args.dry_run else "Archived"
+            for name in archived:
+                print(f"{prefix} {name}")
+            print(f"{prefix} {len(archived)} partitions")
+        elif args.action == "restore":
+            if not args.name:
+                print("A partition name is required for restore")
+                return 1
+            partitions.restore_partition(db, args.name, args.archive_dir)
+            print(f"Restored {args.name}")
+    finally:
+        db.close()
+    return 0
+
+
+def changes_command(args) -> int:
+    db = SessionLocal()
+    try:
+        removed = changes.compact_changes(db, args.retention_days, args.tombstone_days, args.dry_run)
+    finally:
+        db.close()
+    prefix = "Would remove" if args.dry_run else "Removed"
+    print(f"{prefix} {removed['superseded']} superseded events and {removed['tombstones']} tombstones")
+    return 0
+
+
+def idempotency_command(args) -> int:
+    db = SessionLocal()
+    try:
+        removed = idempotency.purge_expired_keys(db, args.dry_run)
+    finally:
+        db.close()
+    prefix = "Would remove" if args.dry_run else "Removed"
+    print(f"{prefix} {removed} expired idempotency keys")
+    return 0
+
+
+def uploads_command(args) -> int:
+    db = SessionLocal()
+    try:
+        expired = resumable_uploads.expire_sessions(db, args.dry_run)
+    finally:
+        db.close()
+    prefix = "Would expire" if args.dry_run else "Expired"
+    print(f"{prefix} {expired} abandoned upload sessions")
+    return 0
+
+
+def storage_command(args) -> int:
+    db = SessionLocal()
+    try:
+        if args.action == "migrate-layout":
+            report = storage_layout.migrate_legacy_files(db, args.batch_size, args.dry_run)
+        elif args.action == "tier":
+            report = tiering.tier_blobs(db, args.cold_after_days, args.dry_run)
+        else:
+            report = storage_gc.reconcile_storage(db, args.grace_hours, args.dry_run)
+    finally:
+        db.close()
+    if args.action == "migrate-layout":
+        prefix = "Would move" if args.dry_run else "Moved"
+        print(f"{prefix} {report['files']} legacy files ({report['bytes']} bytes, {report['rows']} rows) into the blob store")
+        if report["missing"]:
+            print(f"{report['missing']} rows point at missing files")
+        return 0
+
+    if args.action == "tier":
+        prefix = "Would move" if args.dry_run else "Moved"
+        print(f"{prefix} {report['demoted']} blobs to the cold tier ({report['bytes_demoted']} bytes)")
+        print(f"{prefix} {report['promoted']} blobs back to the hot tier ({report['bytes_promoted']} bytes)")
+        return 0
+
+    prefix = "Would remove" if args.dry_run else "Removed"
+    print(f"{prefix} {report['blobs']} unreferenced blobs")
+    print(f"{prefix} {report['files']} orphan files ({report['bytes']} bytes)")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    partitions_parser = subparsers.add_parser("partitions", help="Manage form_responses partitions")
+    partitions_parser.add_argument("action", choices=["ensure", "list", "archive", "restore"])
+    partitions_parser.add_argument("name", nargs="?", help="Partition to restore, e.g. form_responses_2024_01")
+    partitions_parser.add_argument("--months-ahead", type=int, default=partitions.PARTITION_MONTHS_AHEAD)
+    partitions_parser.add_argument("--older-than", type=int, help="Archive partitions older than this many months")
+    partitions_parser.add_argument("--archive-dir", default=partitions.PARTITION_ARCHIVE_DIR)
+    partitions_parser.add_argument("--dry-run", action="store_true")
+    partitions_parser.set_defaults(handler=partitions_command)
+
+    changes_parser = subparsers.add_parser("changes", help="Maintain the response change feed")
+    changes_parser.add_argument("action", choices=["compact"])
+    changes_parser.add_argument("--retention-days", type=int, default=changes.CHANGE_FEED_RETENTION_DAYS)
+    changes_parser.add_argument("--tombstone-days", type=int, default=changes.CHANGE_FEED_TOMBSTONE_DAYS)
+    changes_parser.add_argument("--dry-run", action="store_true")
+    changes_parser.set_defaults(handler=changes_command)
+
+    idempotency_parser = subparsers.add_parser("idempotency", help="Maintain stored idempotent responses")
+    idempotency_parser.add_argument("action", choices=["purge"])
+    idempotency_parser.add_argument("--dry-run", action="store_true")
+    idempotency_parser.set_defaults(handler=idempotency_command)
+
+    uploads_parser = subparsers.add_parser("uploads", help="Maintain resumable uploads")
+    uploads_parser.add_argument("action", choices=["expire"])
+    uploads_parser.add_argument("--dry-run", action="store_true")
+    uploads_parser.set_defaults(handler=uploads_command)
+
+    storage_parser = subparsers.add_parser("storage", help="Maintain upload storage")
+    storage_parser.add_argument("action", choices=["gc", "migrate-layout", "tier"])
+    storage_parser.add_argument("--grace-hours", type=int, default=storage_gc.STORAGE_GC_GRACE_HOURS)
+    storage_parser.add_argument("--batch-size", type=int, default=storage_layout.STORAGE_MIGRATE_BATCH_SIZE)
+    storage_parser.add_argument("--cold-after-days", type=int, default=tiering.COLD_STORAGE_AFTER_DAYS)
+    storage_parser.add_argument("--dry-run", action="store_true")
+    storage_parser.set_defaults(handler=storage_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, LargeBinary, Boolean, DateTime, Float, ForeignKey, JSON, Enum, FetchedValue, Numeric, ForeignKeyConstraint, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import enum
 from datetime import datetime, timedelta
 from .database import Base
@@ -37,7 +38,8 @@ class User(Base):
     site = relationship("Site", back_populates="users")
     messages_sent = relationship("Message", back_populates="sender", foreign_keys="Message.sender_id")
     messages_received = relationship("Message", back_populates="recipient", foreign_keys="Message.recipient_id")
-    form_responses = relationship("FormResponse", back_populates="user")
+    # Removed with delete_responses; the ORM must not null their user_id
+    form_responses = relationship("FormResponse", back_populates="user", passive_deletes="all")
     tickets_created = relationship("Ticket", back_populates="created_by")
     ticket_comments = relationship("TicketComment", back_populates="user")
 
@@ -56,7 +58,8 @@ class Site(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     users = relationship("User", back_populates="site")
-    forms = relationship("Form", back_populates="site")
+    # Removed by ON DELETE CASCADE; the ORM must not null their site_id
+    forms = relationship("Form", back_populates="site", passive_deletes="all")
     tickets = relationship("Ticket", back_populates="site")
 
 class Form(Base):
@@ -66,25 +69,169 @@ class Form(Base):
     title = Column(String)
     description = Column(String, nullable=True)
     fields = Column(JSON)
+    current_version = Column(Integer, default=1, nullable=False)
+    # Content hash of the static JSON definition written on create/update
+    snapshot_hash = Column(String, nullable=True)
     site_id = Column(Integer, ForeignKey("sites.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     site = relationship("Site", back_populates="forms")
-    responses = relationship("FormResponse", back_populates="form")
+    # Removed with delete_responses; the ORM must not null their form_id
+    responses = relationship("FormResponse", back_populates="form", passive_deletes="all")
+    versions = relationship("FormVersion", back_populates="form", cascade="all, delete-orphan", passive_deletes=True)
+
+class FormVersion(Base):
+    """Immutable snapshot of a form's fields; a new row is written on every change."""
+    __tablename__ = "form_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    form_id = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    fields = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    form = relationship("Form", back_populates="versions")
+
+    __table_args__ = (
+        UniqueConstraint("form_id", "version", name="uq_form_versions_form_id_version"),
+    )
 
 class FormResponse(Base):
     __tablename__ = "form_responses"
 
     id = Column(Integer, primary_key=True, index=True)
     form_id = Column(Integer, ForeignKey("forms.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
-    data = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # NULL for anonymous submissions made through a published form link
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    form_version = Column(Integer, nullable=True)
+    data = Column(JSONB)
+    # Incremented on every patch, checked against If-Match for optimistic concurrency
+    revision = Column(Integer, default=1, server_default="1", nullable=False)
+    # Generated column over the string values of data (see SEARCH_LANGUAGE)
+    search_vector = Column(TSVECTOR, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    # Partition key: the table is range-partitioned by month on created_at
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     form = relationship("Form", back_populates="responses")
     user = relationship("User", back_populates="form_responses")
+    version = relationship(
+        "FormVersion",
+        primaryjoin="and_(foreign(FormResponse.form_id) == FormVersion.form_id, "
+                    "foreign(FormResponse.form_version) == FormVersion.version)",
+        viewonly=True,
+        uselist=False
+    )
+
+    __table_args__ = (
+        Index("idx_form_responses_form_id_created_at", "form_id", "created_at"),
+        Index(
+            "idx_form_responses_created_at_brin", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32}
+        ),
+    )
+
+    # Fetch created_at with RETURNING so derived rows can reference the partition key
+    __mapper_args__ = {"eager_defaults": True}
+
+class FormResponseValue(Base):
+    """Typed copy of a response value for fields flagged as indexed in Form.fields."""
+    __tablename__ = "form_response_values"
+
+    response_id = Column(Integer, primary_key=True)
+    field_id = Column(String, primary_key=True)
+    response_created_at = Column(DateTime(timezone=True), nullable=False)
+    form_id = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    value_text = Column(String, nullable=True)
+    value_number = Column(Numeric, nullable=True)
+    value_date = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["response_id", "response_created_at"],
+            ["form_responses.id", "form_responses.created_at"],
+            ondelete="CASCADE"
+        ),
+        Index("idx_form_response_values_text", "form_id", "field_id", "value_text"),
+        Index("idx_form_response_values_number", "form_id", "field_id", "value_number"),
+        Index("idx_form_response_values_date", "form_id", "field_id", "value_date"),
+    )
+
+class FormDraft(Base):
+    """Autosaved, not yet submitted answers of a user to a form."""
+    __tablename__ = "form_drafts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    form_id = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    data = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "form_id", name="uq_form_drafts_user_id_form_id"),
+    )
+
+class FormExport(Base):
+    """Columnar export job of a form's responses."""
+    __tablename__ = "form_exports"
+
+    id = Column(Integer, primary_key=True, index=True)
+    form_id = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    requested_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    format = Column(String, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    file_path = Column(String, nullable=True)
+    row_count = Column(Integer, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class IdempotencyKey(Base):
+    """Response stored for a write request, replayed when it is retried with the same key."""
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the caller's credentials and the Idempotency-Key header
+    key = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=True)
+    # NULL while the original request is still running
+    status_code = Column(Integer, nullable=True)
+    # Lease of the request running it, renewed while it runs; retries take the key over once it lapses
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    lock_token = Column(String(32), nullable=True)
+    headers = Column(JSONB, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class RateLimitBucket(Base):
+    """Token bucket shared by all workers, one row per limited key."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(128), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+class ResponseChange(Base):
+    """Transactional outbox of form response changes for downstream consumers."""
+    __tablename__ = "response_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    # Writing transaction, used to hand out events only once they can no longer be overtaken
+    txid = Column(BigInteger, server_default=text("txid_current()"), nullable=False)
+    response_id = Column(Integer, nullable=False)
+    form_id = Column(Integer, nullable=False)
+    site_id = Column(Integer, nullable=True)
+    operation = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_response_changes_txid_id", "txid", "id"),
+        Index("idx_response_changes_response_id", "response_id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -108,6 +255,112 @@ class File(Base):
     original_filename = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class FileBlob(Base):
+    """Uploaded content stored once under its SHA-256, shared by every file row pointing at it."""
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False)
+    # Maintained by triggers on uploaded_files and message_attachments
+    ref_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Set by the same triggers when ref_count drops to zero; starts the grace period
+    released_at = Column(DateTime(timezone=True), nullable=True)
+    # "hot" in the storage backend, "cold" in the archive tier under COLD_STORAGE_DIR
+    tier = Column(String(8), default="hot", server_default="hot", nullable=False)
+    compression = Column(String(16), nullable=True)  # of the cold copy, e.g. "gzip"
+    stored_size = Column(BigInteger, nullable=True)  # bytes taken on the cold tier
+    # Updated on download at most every BLOB_ACCESS_UPDATE_HOURS
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    tiered_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_file_blobs_unreferenced", "sha256", postgresql_where=text("ref_count <= 0")),
+        Index("idx_file_blobs_tier_last_accessed_at", "tier", "last_accessed_at"),
+    )
+
+class PdfCacheEntry(Base):
+    """Rendered PDF stored under pdfs/<digest>.pdf, the digest covering everything it shows."""
+    __tablename__ = "pdf_cache"
+
+    digest = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Least recently used entries are evicted first
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+class UploadedFile(Base):
+    __tablename__ = "uploaded_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    original_filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    # No foreign key: form_responses is partitioned and its key includes created_at
+    form_response_id = Column(Integer, nullable=False)
+    # NULL for files stored before content addressing
+    blob_sha256 = Column(String(64), ForeignKey("file_blobs.sha256"), nullable=True, index=True)
+    size = Column(BigInteger, nullable=True)
+    checksum = Column(String(64), nullable=True)  # sha256, hex
+    # Whose storage the file counts against: the response's user and the form's site
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    site_id = Column(Integer, ForeignKey("sites.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_uploaded_files_user_id_id", "user_id", "id"),
+    )
+
+class MessageAttachment(Base):
+    __tablename__ = "message_attachments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    original_filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False)
+    # NULL for files stored before content addressing
+    blob_sha256 = Column(String(64), ForeignKey("file_blobs.sha256"), nullable=True, index=True)
+    size = Column(BigInteger, nullable=True)
+    checksum = Column(String(64), nullable=True)  # sha256, hex
+    # Whose storage the file counts against: the sender and their site
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    site_id = Column(Integer, ForeignKey("sites.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_message_attachments_user_id_id", "user_id", "id"),
+    )
+
+class StorageUsage(Base):
+    """Bytes and files stored per user or per site, maintained by triggers on the file tables."""
+    __tablename__ = "storage_usage"
+
+    scope = Column(String(8), primary_key=True)  # "user" or "site"
+    owner_id = Column(Integer, primary_key=True)
+    bytes = Column(BigInteger, default=0, server_default="0", nullable=False)
+    files = Column(Integer, default=0, server_default="0", nullable=False)
+    # NULL uses the default quota of the scope
+    quota_bytes = Column(BigInteger, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UploadSession(Base):
+    """Resumable upload in progress; its data is appended to a single file under UPLOAD_DIR/incoming/sessions."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    original_filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # Bytes received so far; the next chunk must start here
+    offset = Column(BigInteger, default=0, server_default="0", nullable=False)
+    # Exactly one target: a form response or a message
+    response_id = Column(Integer, nullable=True)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
 class Ticket(Base):
     __tablename__ = "tickets"
 
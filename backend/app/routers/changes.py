@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..database import get_db
+from ..models import User, UserRole
+from ..schemas import ChangeFeedResponse
+from ..auth import get_current_active_user
+from ..services.changes import list_changes
+
+router = APIRouter()
+
+@router.get("/", response_model=ChangeFeedResponse)
+async def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get form response change events after a cursor (admins only)."""
+    if current_user.role == UserRole.SUPER_ADMIN:
+        site_id = None
+    elif current_user.role == UserRole.SITE_ADMIN:
+        site_id = current_user.site_id
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to read the change feed"
+        )
+
+    try:
+        return list_changes(db, since, limit, site_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
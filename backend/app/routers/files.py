@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from ..database import get_db
+from ..models import User, Form, FormResponse, Message, UploadedFile, MessageAttachment, FileBlob, UserRole
+from ..auth import get_current_active_user
+from ..services.blobs import stored_path
+from ..services.downloads import file_download_response
+from ..services.images import IMAGE_VARIANTS
+from ..services.tiering import touch_blob
+
+router = APIRouter()
+
+variant_pattern = "^(" + "|".join(IMAGE_VARIANTS) + ")$"
+
+async def _file_response(request: Request, db: Session, stored, variant: Optional[str]):
+    blob = None
+    if stored.blob_sha256:
+        # Downloads keep files on the hot tier, or bring them back
+        touch_blob(db, stored.blob_sha256)
+        blob = db.get(FileBlob, stored.blob_sha256)
+    # Looks up the file in storage, which may be remote
+    return await run_in_threadpool(
+        file_download_response,
+        request, stored_path(stored), stored.original_filename, stored.checksum,
+        blob=blob, variant=variant
+    )
+
+@router.get("/{file_id}/download")
+async def download_file(
+    file_id: int,
+    request: Request,
+    size: Optional[str] = Query(None, pattern=variant_pattern, description="Image variant, e.g. thumbnail"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a file uploaded for a form response (supports Range requests)."""
+    uploaded_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+    if not uploaded_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    owner = db.query(FormResponse.user_id, Form.site_id).join(
+        Form, Form.id == FormResponse.form_id
+    ).filter(FormResponse.id == uploaded_file.form_response_id).first()
+    if not owner:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    # Owners, admins of the form's site and super admins may download
+    if current_user.role != UserRole.SUPER_ADMIN and owner.user_id != current_user.id:
+        if current_user.role != UserRole.SITE_ADMIN or owner.site_id != current_user.site_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot access this file"
+            )
+
+    return await _file_response(request, db, uploaded_file, size)
+
+@router.get("/attachments/{attachment_id}/download")
+async def download_attachment(
+    attachment_id: int,
+    request: Request,
+    size: Optional[str] = Query(None, pattern=variant_pattern, description="Image variant, e.g. thumbnail"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a message attachment (sender and recipient only, supports Range requests)."""
+    attachment = db.query(MessageAttachment).join(
+        Message, Message.id == MessageAttachment.message_id
+    ).filter(
+        MessageAttachment.id == attachment_id,
+        or_(
+            Message.sender_id == current_user.id,
+            Message.recipient_id == current_user.id
+        )
+    ).first()
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment not found or access denied"
+        )
+
+    return await _file_response(request, db, attachment, size)
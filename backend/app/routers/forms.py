@@ -1,20 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, BackgroundTasks, Response, Header, Body
+from fastapi import Form as FormField
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
 from ..database import get_db
-from ..models import User, Form, FormResponse, UploadedFile, UserRole
+from ..models import User, Form, FormResponse, FormResponseValue, FormExport, UploadedFile, UserRole
 from ..schemas import (
     FormCreate,
     FormUpdate,
     FormResponse as FormResponseSchema,
     FormSubmissionResponse,
+    FormSubmissionWithFilesResponse,
+    FormResponseSearchHit,
+    FormVersionResponse,
+    PublicFormLink,
+    FormSnapshotResponse,
+    FormDraftResponse,
+    FormExportResponse,
+    ExportFormat,
     UploadedFileResponse
 )
-from ..auth import get_current_active_user
+from ..auth import get_current_active_user, create_public_form_token
+from ..services.search import search_form_responses
+from ..services.indexed_fields import indexed_fields, typed_value, drop_field_values, backfill_indexed_fields
+from ..services.responses import create_form_response, delete_responses, validate_merge_patch, patch_form_response
+from ..services.form_versions import create_form_version, get_form_version, forget_form
+from ..services.form_snapshots import remove_form_snapshot, snapshot_path, snapshot_url, write_form_snapshot
+from ..services.drafts import draft_buffer, load_draft
+from ..services.exports import EXPORT_FORMATS, run_export
+from ..services.fieldsets import resolve_fieldset, fieldset_options, serialize_fieldset
+from ..services.uploads import save_upload, save_uploads, remove_files
+from ..services.blobs import store_blob, blob_columns
+from ..services.images import derivative_pool
+from ..services.storage_quotas import check_quota, file_owner
 
 router = APIRouter()
 
@@ -47,21 +71,43 @@ async def create_form(
     )
 
     db.add(new_form)
+    db.flush()
+    create_form_version(db, new_form)
+    write_form_snapshot(new_form)
     db.commit()
     db.refresh(new_form)
 
     return new_form
 
+def _form_fieldset(fields: Optional[str], exclude: Optional[str]) -> Optional[List[str]]:
+    try:
+        return resolve_fieldset(FormResponseSchema, fields, exclude)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def _sparse_form(form: Form, fieldset: List[str]) -> dict:
+    return serialize_fieldset(form, fieldset, converters={
+        "fields": lambda value: json.loads(value) if isinstance(value, str) else value
+    })
+
 @router.get("/", response_model=List[FormResponseSchema])
 async def list_forms(
     site_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return, e.g. id,title"),
+    exclude: Optional[str] = Query(None, description="Comma-separated attributes to leave out"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """List forms for a site."""
+    fieldset = _form_fieldset(fields, exclude)
     query = db.query(Form)
+    if fieldset is not None:
+        query = query.options(*fieldset_options(Form, fieldset))
 
     if current_user.role == UserRole.SUPER_ADMIN:
         if site_id:
@@ -72,16 +118,25 @@ async def list_forms(
         query = query.filter(Form.site_id == current_user.site_id)
 
     forms = query.offset(skip).limit(limit).all()
+    if fieldset is not None:
+        return JSONResponse([_sparse_form(form, fieldset) for form in forms])
     return forms
 
 @router.get("/{form_id}", response_model=FormResponseSchema)
 async def get_form(
     form_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return, e.g. id,title"),
+    exclude: Optional[str] = Query(None, description="Comma-separated attributes to leave out"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific form."""
-    form = db.query(Form).filter(Form.id == form_id).first()
+    fieldset = _form_fieldset(fields, exclude)
+    query = db.query(Form)
+    if fieldset is not None:
+        # site_id is needed for the permission check below
+        query = query.options(*fieldset_options(Form, fieldset + ["site_id"]))
+    form = query.filter(Form.id == form_id).first()
     if not form:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,12 +151,49 @@ async def get_form(
                 detail="Cannot access form from another site"
             )
 
+    if fieldset is not None:
+        return JSONResponse(_sparse_form(form, fieldset))
     return form
 
+@router.get("/{form_id}/snapshot", response_model=FormSnapshotResponse)
+async def get_form_snapshot(
+    form_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the content hash and URL of the form's static definition."""
+    row = db.query(Form.site_id, Form.snapshot_hash).filter(Form.id == form_id).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    if current_user.role != UserRole.SUPER_ADMIN and row.site_id != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot access form from another site"
+        )
+
+    snapshot_hash = row.snapshot_hash
+    if snapshot_hash is None or not os.path.exists(snapshot_path(snapshot_hash)):
+        # Forms created before snapshots existed get one on first lookup, as do
+        # forms whose file is missing (written on another node, or pruned)
+        form = db.query(Form).filter(Form.id == form_id).first()
+        snapshot_hash = write_form_snapshot(form)
+        db.commit()
+
+    return {
+        "form_id": form_id,
+        "hash": snapshot_hash,
+        "url": snapshot_url(snapshot_hash)
+    }
+
 @router.put("/{form_id}", response_model=FormResponseSchema)
 async def update_form(
     form_id: int,
     form_data: FormUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -126,6 +218,9 @@ async def update_form(
             detail="Cannot update form from another site"
         )
 
+    previously_indexed = indexed_fields(form.fields)
+    previous_fields = form.fields
+
     # Update form fields
     for field, value in form_data.dict(exclude_unset=True).items():
         if field == "fields" and value is not None:
@@ -133,9 +228,28 @@ async def update_form(
         else:
             setattr(form, field, value)
 
+    # Changed fields become a new immutable version; older versions stay untouched
+    if form.fields != previous_fields:
+        create_form_version(db, form)
+
+    # Keep the typed values table in sync with the "indexed" flags
+    now_indexed = indexed_fields(form.fields)
+    drop_field_values(db, form.id, [
+        field_id for field_id, column in previously_indexed.items()
+        if now_indexed.get(field_id) != column
+    ])
+    newly_indexed = [
+        field_id for field_id, column in now_indexed.items()
+        if previously_indexed.get(field_id) != column
+    ]
+
+    write_form_snapshot(form)
     db.commit()
     db.refresh(form)
 
+    if newly_indexed:
+        background_tasks.add_task(backfill_indexed_fields, form.id, newly_indexed)
+
     return form
 
 @router.delete("/{form_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -165,10 +279,95 @@ async def delete_form(
             detail="Cannot delete form from another site"
         )
 
+    snapshot_hash = form.snapshot_hash
+    delete_responses(db, FormResponse.form_id == form_id)
     db.delete(form)
     db.commit()
+    forget_form(form_id)
+    # The snapshot is public; take it down with the form
+    remove_form_snapshot(snapshot_hash)
     return None
 
+@router.get("/{form_id}/versions/{version}", response_model=FormVersionResponse)
+async def get_version(
+    form_id: int,
+    version: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get an immutable version of a form's fields."""
+    form_version = get_form_version(db, form_id, version)
+    if not form_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form version not found"
+        )
+
+    if current_user.role != UserRole.SUPER_ADMIN and form_version["site_id"] != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot access form from another site"
+        )
+
+    # A version never changes, so clients may keep it forever
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    response.headers["ETag"] = f'"form-{form_id}-v{version}"'
+    return form_version
+
+@router.post("/{form_id}/publish", response_model=PublicFormLink)
+async def publish_form(
+    form_id: int,
+    expires_in_days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create a signed link accepting anonymous submissions (site admin only)."""
+    if current_user.role != UserRole.SITE_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only site admins can publish forms"
+        )
+
+    form = db.query(Form).filter(Form.id == form_id).first()
+    if not form:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    if form.site_id != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot publish form from another site"
+        )
+
+    # The link is bound to the current version; republish after changing fields
+    expires_delta = timedelta(days=expires_in_days)
+    token = create_public_form_token(form.id, form.site_id, form.current_version, expires_delta)
+
+    return {
+        "token": token,
+        "form_version": form.current_version,
+        "expires_at": datetime.utcnow() + expires_delta,
+        "submit_url": f"/api/public/forms/{token}/submit"
+    }
+
+def _get_form_for_submission(db: Session, form_id: int, current_user: User) -> Form:
+    form = db.query(Form).filter(Form.id == form_id).first()
+    if not form:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    if current_user.site_id != form.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot submit form for another site"
+        )
+    return form
+
 @router.post("/{form_id}/submit", response_model=FormSubmissionResponse)
 async def submit_form(
     form_id: int,
@@ -177,6 +376,185 @@ async def submit_form(
     current_user: User = Depends(get_current_active_user)
 ):
     """Submit a form response."""
+    # Validate that user belongs to the correct site
+    form = _get_form_for_submission(db, form_id, current_user)
+
+    # Create form response
+    form_response = create_form_response(
+        db, form.id, form.site_id, form.current_version, form.fields, current_user.id, data
+    )
+    db.commit()
+    db.refresh(form_response)
+
+    return form_response
+
+@router.post("/{form_id}/submit/multipart", response_model=FormSubmissionWithFilesResponse)
+async def submit_form_with_files(
+    form_id: int,
+    data: str = FormField(..., description="JSON-encoded response data"),
+    files: List[UploadFile] = File([]),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Submit a form response and its files in a single request.
+
+    Files are written concurrently, then the response and its uploaded_files
+    rows are committed together; if anything fails, nothing is kept.
+    """
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="data must be a JSON object"
+        )
+
+    form = _get_form_for_submission(db, form_id, current_user)
+    if files:
+        check_quota(db, current_user.id, form.site_id, sum(file.size or 0 for file in files))
+
+    saved = await save_uploads(files)
+    try:
+        form_response = create_form_response(
+            db, form.id, form.site_id, form.current_version, form.fields, current_user.id, payload
+        )
+        uploaded_files = []
+        for file, stored in zip(files, saved):
+            # Storage calls block on the transfer, so they run off the event loop
+            blob = await run_in_threadpool(store_blob, db, stored)
+            uploaded_files.append(UploadedFile(
+                **blob_columns(blob),
+                original_filename=file.filename,
+                form_response_id=form_response.id,
+                user_id=current_user.id,
+                site_id=form.site_id
+            ))
+        db.add_all(uploaded_files)
+        if uploaded_files:
+            db.flush()
+            check_quota(db, current_user.id, form.site_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Blobs already moved into place are left to the storage reconciler
+        remove_files([stored.file_path for stored in saved])
+        raise
+
+    db.refresh(form_response)
+    for uploaded_file in uploaded_files:
+        db.refresh(uploaded_file)
+        derivative_pool.schedule(uploaded_file.blob_sha256, uploaded_file.original_filename)
+    return {
+        **FormSubmissionResponse.from_orm(form_response).dict(),
+        "files": uploaded_files
+    }
+
+@router.put("/{form_id}/draft", status_code=status.HTTP_202_ACCEPTED)
+async def autosave_draft(
+    form_id: int,
+    changes: dict,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Autosave changed fields of a draft.
+
+    Changes are buffered in memory and persisted at most once per flush interval.
+    """
+    form_site_id = db.query(Form.site_id).filter(Form.id == form_id).scalar()
+    if form_site_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+    if current_user.site_id != form_site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot submit form for another site"
+        )
+
+    draft_buffer.save(current_user.id, form_id, changes)
+    return {"status": "buffered"}
+
+@router.get("/{form_id}/draft", response_model=FormDraftResponse)
+async def get_draft(
+    form_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the current draft, including changes not yet persisted."""
+    draft = load_draft(db, current_user.id, form_id)
+    pending = draft_buffer.peek(current_user.id, form_id)
+    if not draft and not pending:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Draft not found"
+        )
+
+    return {
+        "form_id": form_id,
+        "data": {**(draft.data if draft else {}), **pending},
+        "updated_at": draft.updated_at if draft else None
+    }
+
+@router.post("/{form_id}/draft/submit", response_model=FormSubmissionResponse)
+async def submit_draft(
+    form_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Turn the current draft into a form response."""
+    form = _get_form_for_submission(db, form_id, current_user)
+
+    pending = await run_in_threadpool(draft_buffer.take, current_user.id, form_id)
+    try:
+        draft = load_draft(db, current_user.id, form_id, for_update=True)
+        if not draft and not pending:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Draft not found"
+            )
+
+        data = {**(draft.data if draft else {}), **pending}
+
+        # The response replaces the draft in the same transaction
+        form_response = create_form_response(
+            db, form.id, form.site_id, form.current_version, form.fields, current_user.id, data
+        )
+        if draft:
+            db.delete(draft)
+        db.commit()
+    except BaseException:
+        # The draft row is rolled back; its buffered edits must survive too
+        db.rollback()
+        draft_buffer.restore(current_user.id, form_id, pending)
+        raise
+    db.refresh(form_response)
+
+    return form_response
+
+@router.get("/{form_id}/responses", response_model=List[FormSubmissionResponse])
+async def list_responses(
+    form_id: int,
+    field: Optional[str] = None,
+    eq: Optional[str] = None,
+    gte: Optional[str] = None,
+    lte: Optional[str] = None,
+    created_from: Optional[datetime] = Query(None, alias="from", description="Responses created at or after"),
+    created_to: Optional[datetime] = Query(None, alias="to", description="Responses created before"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List responses of a form, optionally filtered on an indexed field and a creation time range."""
+    if created_from and created_to and created_from >= created_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from must be before to"
+        )
+
     form = db.query(Form).filter(Form.id == form_id).first()
     if not form:
         raise HTTPException(
@@ -184,24 +562,288 @@ async def submit_form(
             detail="Form not found"
         )
 
-    # Validate that user belongs to the correct site
-    if current_user.site_id != form.site_id:
+    if current_user.role != UserRole.SUPER_ADMIN and form.site_id != current_user.site_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Cannot submit form for another site"
+            detail="Cannot access form from another site"
         )
 
-    # Create form response
-    form_response = FormResponse(
+    query = db.query(FormResponse).filter(FormResponse.form_id == form_id)
+
+    # A bounded created_at prunes partitions and uses the (form_id, created_at) index
+    if created_from is not None:
+        query = query.filter(FormResponse.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(FormResponse.created_at < created_to)
+
+    # Regular users only see their own submissions
+    if current_user.role == UserRole.USER:
+        query = query.filter(FormResponse.user_id == current_user.id)
+
+    if field is not None:
+        column_name = indexed_fields(form.fields).get(field)
+        if column_name is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Field is not indexed"
+            )
+        if eq is None and gte is None and lte is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Filtering on a field requires eq, gte or lte"
+            )
+
+        value_column = getattr(FormResponseValue, column_name)
+        conditions = [
+            FormResponseValue.form_id == form_id,
+            FormResponseValue.field_id == field
+        ]
+        for operator, raw_value in (("eq", eq), ("gte", gte), ("lte", lte)):
+            if raw_value is None:
+                continue
+            value = typed_value(column_name, raw_value)
+            if value is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid value for {operator}"
+                )
+            if operator == "eq":
+                conditions.append(value_column == value)
+            elif operator == "gte":
+                conditions.append(value_column >= value)
+            else:
+                conditions.append(value_column <= value)
+
+        query = query.join(
+            FormResponseValue,
+            and_(
+                FormResponseValue.response_id == FormResponse.id,
+                FormResponseValue.response_created_at == FormResponse.created_at
+            )
+        ).filter(*conditions)
+
+    return query.order_by(
+        FormResponse.created_at.desc(),
+        FormResponse.id.desc()
+    ).offset(skip).limit(limit).all()
+
+@router.get("/{form_id}/responses/search", response_model=List[FormResponseSearchHit])
+async def search_responses(
+    form_id: int,
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Full-text search over a form's responses (admins only)."""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.SITE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can search form responses"
+        )
+
+    form_site_id = db.query(Form.site_id).filter(Form.id == form_id).scalar()
+    if form_site_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    if current_user.role != UserRole.SUPER_ADMIN and form_site_id != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot access form from another site"
+        )
+
+    return search_form_responses(db, form_id, q, skip, limit)
+
+def _get_form_export(db: Session, form_id: int, export_id: int, current_user: User) -> FormExport:
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.SITE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export form responses"
+        )
+
+    export = db.query(FormExport).filter(
+        FormExport.id == export_id,
+        FormExport.form_id == form_id
+    ).first()
+    if not export:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+
+    form_site_id = db.query(Form.site_id).filter(Form.id == form_id).scalar()
+    if current_user.role != UserRole.SUPER_ADMIN and form_site_id != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot access form from another site"
+        )
+
+    return export
+
+@router.post("/{form_id}/exports", response_model=FormExportResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export(
+    form_id: int,
+    background_tasks: BackgroundTasks,
+    format: ExportFormat = ExportFormat.PARQUET,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Start a columnar export of a form's responses (admins only)."""
+    if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.SITE_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export form responses"
+        )
+
+    form_site_id = db.query(Form.site_id).filter(Form.id == form_id).scalar()
+    if form_site_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    if current_user.role != UserRole.SUPER_ADMIN and form_site_id != current_user.site_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot access form from another site"
+        )
+
+    export = FormExport(
         form_id=form_id,
-        user_id=current_user.id,
-        data=json.dumps(data)
+        requested_by_id=current_user.id,
+        format=format.value
     )
+    db.add(export)
+    db.commit()
+    db.refresh(export)
+
+    # The file is written after the response is sent; poll the export for its status
+    background_tasks.add_task(run_export, export.id)
+    return export
+
+@router.get("/{form_id}/exports/{export_id}", response_model=FormExportResponse)
+async def get_export(
+    form_id: int,
+    export_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the status of an export."""
+    return _get_form_export(db, form_id, export_id, current_user)
+
+@router.get("/{form_id}/exports/{export_id}/download")
+async def download_export(
+    form_id: int,
+    export_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a completed export."""
+    export = _get_form_export(db, form_id, export_id, current_user)
+    if export.status != "completed" or not export.file_path or not os.path.exists(export.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Export is not ready"
+        )
+
+    extension, media_type = EXPORT_FORMATS[export.format]
+    return FileResponse(
+        export.file_path,
+        media_type=media_type,
+        filename=f"form_{form_id}_responses.{extension}"
+    )
+
+@router.patch("/{form_id}/responses/{response_id}", response_model=FormSubmissionResponse)
+async def patch_response(
+    form_id: int,
+    response_id: int,
+    response: Response,
+    patch: dict = Body(..., media_type="application/merge-patch+json"),
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Partially update a form response with a JSON merge patch (RFC 7396).
+
+    Requires an If-Match header carrying the revision (ETag) the patch is based on.
+    """
+    if if_match is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="If-Match header with the response revision is required"
+        )
+    try:
+        expected_revision = int(if_match.removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid If-Match header"
+        )
+
+    # Load only the metadata: the data blob is patched in the database
+    current = db.query(
+        FormResponse.user_id,
+        FormResponse.form_version,
+        FormResponse.revision
+    ).filter(
+        FormResponse.id == response_id,
+        FormResponse.form_id == form_id
+    ).first()
+    if not current:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form response not found"
+        )
+
+    form_version = get_form_version(db, form_id, current.form_version) if current.form_version else None
+    if form_version:
+        site_id, fields = form_version["site_id"], form_version["fields"]
+    else:
+        form = db.query(Form).filter(Form.id == form_id).first()
+        site_id, fields = form.site_id, form.fields
+
+    # Check permissions
+    if current_user.role == UserRole.SUPER_ADMIN:
+        pass
+    elif current_user.role == UserRole.SITE_ADMIN:
+        if site_id != current_user.site_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot update response from another site"
+            )
+    elif current.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot update another user's response"
+        )
 
-    db.add(form_response)
+    errors = validate_merge_patch(fields, patch)
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+
+    if current.revision != expected_revision:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Response was modified, reload it and retry"
+        )
+
+    form_response = patch_form_response(db, form_id, site_id, fields, response_id, expected_revision, patch)
+    if form_response is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Response was modified, reload it and retry"
+        )
     db.commit()
-    db.refresh(form_response)
 
+    response.headers["ETag"] = f'"{form_response.revision}"'
     return form_response
 
 @router.post("/{form_id}/upload", response_model=UploadedFileResponse)
@@ -231,30 +873,31 @@ async def upload_file(
             detail="Cannot upload file for another user's response"
         )
 
-    # Create upload directory if it doesn't exist
-    upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(upload_dir, filename)
-
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-
-    # Create file record
-    uploaded_file = UploadedFile(
-        filename=filename,
-        original_filename=file.filename,
-        file_path=file_path,
-        form_response_id=response_id
-    )
-
-    db.add(uploaded_file)
-    db.commit()
+    user_id, site_id = file_owner(db, response_id=response_id)
+    check_quota(db, user_id, site_id, file.size or 0)
+
+    # Stream the file to disk, enforcing size and type limits
+    stored = await save_upload(file)
+
+    try:
+        # Identical content is stored once and shared
+        blob = await run_in_threadpool(store_blob, db, stored)
+        uploaded_file = UploadedFile(
+            **blob_columns(blob),
+            original_filename=file.filename,
+            form_response_id=response_id,
+            user_id=user_id,
+            site_id=site_id
+        )
+        db.add(uploaded_file)
+        db.flush()
+        check_quota(db, user_id, site_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        remove_files([stored.file_path])
+        raise
     db.refresh(uploaded_file)
+    derivative_pool.schedule(uploaded_file.blob_sha256, uploaded_file.original_filename)
 
     return uploaded_file
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-import os
-from datetime import datetime
 
 from ..database import get_db
 from ..models import User, Message, MessageAttachment, UserRole
 from ..schemas import MessageCreate, MessageResponse, UploadedFileResponse
 from ..auth import get_current_active_user
+from ..services.uploads import save_upload, remove_files
+from ..services.blobs import store_blob, blob_columns
+from ..services.images import derivative_pool
+from ..services.storage_quotas import check_quota
 
 router = APIRouter()
 
@@ -136,32 +139,31 @@ async def add_attachment(
             detail="Only the sender can add attachments"
         )
 
-    # Create upload directory if it doesn't exist
-    upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
-    message_uploads = os.path.join(upload_dir, "messages", str(message_id))
-    os.makedirs(message_uploads, exist_ok=True)
-
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(message_uploads, filename)
-
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-
-    # Create attachment record
-    attachment = MessageAttachment(
-        filename=filename,
-        original_filename=file.filename,
-        file_path=file_path,
-        message_id=message_id
-    )
+    check_quota(db, current_user.id, current_user.site_id, file.size or 0)
 
-    db.add(attachment)
-    db.commit()
+    # Stream the file to disk, enforcing size and type limits
+    stored = await save_upload(file)
+
+    try:
+        # Identical content is stored once and shared
+        blob = await run_in_threadpool(store_blob, db, stored)
+        attachment = MessageAttachment(
+            **blob_columns(blob),
+            original_filename=file.filename,
+            message_id=message_id,
+            user_id=current_user.id,
+            site_id=current_user.site_id
+        )
+        db.add(attachment)
+        db.flush()
+        check_quota(db, current_user.id, current_user.site_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        remove_files([stored.file_path])
+        raise
     db.refresh(attachment)
+    derivative_pool.schedule(attachment.blob_sha256, attachment.original_filename)
 
     return attachment
 
@@ -186,20 +188,8 @@ async def delete_message(
             detail="Message not found or access denied"
         )
 
-    # Delete all attachments first
-    attachments = db.query(MessageAttachment).filter(
-        MessageAttachment.message_id == message_id
-    ).all()
-
-    for attachment in attachments:
-        # Delete file from filesystem
-        try:
-            os.remove(attachment.file_path)
-        except OSError:
-            pass  # Ignore if file doesn't exist
-        db.delete(attachment)
-
-    # Delete message
+    # Attachment rows go with the message (ON DELETE CASCADE); their files are
+    # reclaimed by the storage reconciler once nothing references them
     db.delete(message)
     db.commit()
 
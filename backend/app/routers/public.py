@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+import math
+import os
+
+from ..database import get_db
+from ..schemas import PublicSubmissionResponse
+from ..auth import decode_public_form_token
+from ..services.form_versions import get_form_version
+from ..services.rate_limit import RateLimiter
+from ..services.responses import create_form_response
+
+router = APIRouter()
+
+PUBLIC_FORM_RATE_LIMIT = int(os.getenv("PUBLIC_FORM_RATE_LIMIT", "600"))  # submissions per minute and form, all workers together
+
+submission_limiter = RateLimiter("public_form", PUBLIC_FORM_RATE_LIMIT)
+
+@router.post("/forms/{token}/submit", response_model=PublicSubmissionResponse)
+async def submit_public_form(
+    token: str,
+    data: dict,
+    db: Session = Depends(get_db)
+):
+    """Submit an anonymous response through a published form link."""
+    # The signed token carries everything needed: no user lookup, no form lookup
+    payload = decode_public_form_token(token)
+    form_id = payload["form_id"]
+
+    retry_after = await run_in_threadpool(submission_limiter.acquire, form_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many submissions for this form, please retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+    form_version = get_form_version(db, form_id, payload["ver"])
+    if not form_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    try:
+        form_response = create_form_response(
+            db, form_id, form_version["site_id"], form_version["version"], form_version["fields"], None, data
+        )
+        db.commit()
+    except IntegrityError:
+        # The form was deleted after its versions were cached
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
+
+    return form_response
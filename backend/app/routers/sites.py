@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
-from ..models import User, Site, UserRole
+from ..models import User, Site, Form, UserRole
 from ..schemas import SiteCreate, SiteUpdate, SiteResponse
 from ..auth import get_current_active_user, validate_super_admin
+from ..services.responses import delete_responses
 
 router = APIRouter()
 
@@ -133,6 +134,7 @@ async def delete_site(
         )
 
     # Delete site
+    delete_responses(db, Form.site_id == site_id)
     db.delete(site)
     db.commit()
 
@@ -0,0 +1,147 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..database import get_db
+from ..models import User, Site, UploadedFile, MessageAttachment, UserRole
+from ..schemas import StorageUsageResponse, StorageQuotaUpdate, UserFilesPage
+from ..auth import get_current_active_user
+from ..services.storage_quotas import SCOPE_SITE, SCOPE_USER, get_usage, set_quota
+
+router = APIRouter()
+
+def _get_user(db: Session, user_id: int, current_user: User, manage: bool = False) -> User:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    # Users see their own storage; admins of their site and super admins manage it
+    if current_user.role != UserRole.SUPER_ADMIN and (manage or user.id != current_user.id):
+        if current_user.role != UserRole.SITE_ADMIN or user.site_id != current_user.site_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this user's storage"
+            )
+
+    # Site admins can't lift their own quota or another admin's
+    if manage and current_user.role != UserRole.SUPER_ADMIN and (
+        user.id == current_user.id or user.role != UserRole.USER
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only super admins can change the quota of an admin"
+        )
+    return user
+
+def _get_site(db: Session, site_id: int, current_user: User) -> Site:
+    if current_user.role != UserRole.SUPER_ADMIN:
+        if current_user.role != UserRole.SITE_ADMIN or current_user.site_id != site_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this site's storage"
+            )
+
+    site = db.query(Site).filter(Site.id == site_id).first()
+    if not site:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Site not found"
+        )
+    return site
+
+@router.get("/users/{user_id}", response_model=StorageUsageResponse)
+async def get_user_usage(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the bytes and files stored by a user, and their quota."""
+    _get_user(db, user_id, current_user)
+    return get_usage(db, SCOPE_USER, user_id)
+
+@router.put("/users/{user_id}/quota", response_model=StorageUsageResponse)
+async def update_user_quota(
+    user_id: int,
+    quota: StorageQuotaUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Set the storage quota of a user (admins only)."""
+    _get_user(db, user_id, current_user, manage=True)
+    set_quota(db, SCOPE_USER, user_id, quota.quota_bytes)
+    db.commit()
+    return get_usage(db, SCOPE_USER, user_id)
+
+def _files_page(query, model, cursor: Optional[int], limit: int) -> dict:
+    if cursor is not None:
+        query = query.filter(model.id < cursor)
+    # One extra row tells whether another page follows
+    files = query.order_by(model.id.desc()).limit(limit + 1).all()
+    has_more = len(files) > limit
+    files = files[:limit]
+    return {
+        "files": files,
+        "next_cursor": files[-1].id if has_more else None,
+        "has_more": has_more
+    }
+
+@router.get("/users/{user_id}/files", response_model=UserFilesPage)
+async def list_user_files(
+    user_id: int,
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the files uploaded for a user's form responses, newest first.
+
+    Message attachments count toward the same usage and are listed by
+    /users/{user_id}/attachments.
+    """
+    _get_user(db, user_id, current_user)
+    query = db.query(UploadedFile).filter(UploadedFile.user_id == user_id)
+    return _files_page(query, UploadedFile, cursor, limit)
+
+@router.get("/users/{user_id}/attachments", response_model=UserFilesPage)
+async def list_user_attachments(
+    user_id: int,
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the message attachments sent by a user, newest first."""
+    _get_user(db, user_id, current_user)
+    query = db.query(MessageAttachment).filter(MessageAttachment.user_id == user_id)
+    return _files_page(query, MessageAttachment, cursor, limit)
+
+@router.get("/sites/{site_id}", response_model=StorageUsageResponse)
+async def get_site_usage(
+    site_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the bytes and files stored for a site, and its quota."""
+    _get_site(db, site_id, current_user)
+    return get_usage(db, SCOPE_SITE, site_id)
+
+@router.put("/sites/{site_id}/quota", response_model=StorageUsageResponse)
+async def update_site_quota(
+    site_id: int,
+    quota: StorageQuotaUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Set the storage quota of a site (super admins only)."""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only super admins can change site quotas"
+        )
+    _get_site(db, site_id, current_user)
+    set_quota(db, SCOPE_SITE, site_id, quota.quota_bytes)
+    db.commit()
+    return get_usage(db, SCOPE_SITE, site_id)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..models import User, Ticket, TicketComment, UserRole
 from ..schemas import TicketCreate, TicketResponse, TicketUpdate, TicketCommentCreate, TicketCommentResponse
 from ..auth import get_current_active_user
+from ..services.fieldsets import resolve_fieldset, fieldset_options, serialize_fieldset
 
 router = APIRouter()
 
@@ -35,31 +37,60 @@ async def create_ticket(
     db.refresh(new_ticket)
     return new_ticket
 
+def _ticket_fieldset(fields: Optional[str], exclude: Optional[str]) -> Optional[List[str]]:
+    try:
+        return resolve_fieldset(TicketResponse, fields, exclude)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def _sparse_ticket(ticket: Ticket, fieldset: List[str]) -> dict:
+    return serialize_fieldset(ticket, fieldset, nested={"comments": TicketCommentResponse})
+
 @router.get("/", response_model=List[TicketResponse])
 async def list_tickets(
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return, e.g. id,title,status"),
+    exclude: Optional[str] = Query(None, description="Comma-separated attributes to leave out, e.g. comments"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """List tickets based on user role."""
+    fieldset = _ticket_fieldset(fields, exclude)
+    query = db.query(Ticket)
+    if fieldset is not None:
+        query = query.options(*fieldset_options(Ticket, fieldset))
+
     if current_user.role == UserRole.SUPER_ADMIN:
-        tickets = db.query(Ticket).all()
+        tickets = query.all()
     elif current_user.role == UserRole.SITE_ADMIN:
-        tickets = db.query(Ticket).filter(Ticket.site_id == current_user.site_id).all()
+        tickets = query.filter(Ticket.site_id == current_user.site_id).all()
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view tickets"
         )
+
+    if fieldset is not None:
+        return JSONResponse([_sparse_ticket(ticket, fieldset) for ticket in tickets])
     return tickets
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return, e.g. id,title,status"),
+    exclude: Optional[str] = Query(None, description="Comma-separated attributes to leave out, e.g. comments"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific ticket."""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    fieldset = _ticket_fieldset(fields, exclude)
+    query = db.query(Ticket)
+    if fieldset is not None:
+        # site_id is needed for the permission check below
+        query = query.options(*fieldset_options(Ticket, fieldset + ["site_id"]))
+    ticket = query.filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -72,6 +103,8 @@ async def get_ticket(
             detail="Not authorized to access this ticket"
         )
 
+    if fieldset is not None:
+        return JSONResponse(_sparse_ticket(ticket, fieldset))
     return ticket
 
 @router.put("/{ticket_id}", response_model=TicketResponse)
@@ -0,0 +1,241 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Header
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+import os
+import uuid
+
+from ..database import get_db
+from ..models import User, FormResponse, Message, UploadSession, UploadedFile, MessageAttachment, UserRole
+from ..schemas import UploadSessionCreate, UploadSessionResponse, UploadedFileResponse
+from ..auth import get_current_active_user
+from ..services.uploads import check_extension
+from ..services.blobs import store_blob, blob_columns
+from ..services.images import derivative_pool
+from ..services.storage_quotas import check_quota, file_owner
+from ..services.resumable_uploads import (
+    RESUMABLE_UPLOAD_MAX_SIZE,
+    RESUMABLE_UPLOADS_ENABLED,
+    UploadBusy,
+    UploadDataMissing,
+    UploadOffsetMismatch,
+    UploadTooLarge,
+    append_chunk,
+    discard_session,
+    finalize_session,
+    get_session,
+    session_expiry
+)
+
+router = APIRouter()
+
+def _check_target(db: Session, upload: UploadSessionCreate, current_user: User) -> None:
+    if (upload.response_id is None) == (upload.message_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Exactly one of response_id or message_id is required"
+        )
+
+    if upload.response_id is not None:
+        form_response = db.query(FormResponse).filter(FormResponse.id == upload.response_id).first()
+        if not form_response:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Form response not found"
+            )
+        if current_user.id != form_response.user_id and current_user.role not in [UserRole.SUPER_ADMIN, UserRole.SITE_ADMIN]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot upload file for another user's response"
+            )
+    else:
+        message = db.query(Message).filter(Message.id == upload.message_id).first()
+        if not message:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+        if message.sender_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only the sender can add attachments"
+            )
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Another request is writing to this upload"
+    )
+
+def _data_missing(error: UploadDataMissing) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Upload data was lost past {error.length} bytes, resume from there",
+        headers={"Upload-Offset": str(error.length)}
+    )
+
+def _get_session(db: Session, session_id: str, current_user: User, for_update: bool = False) -> UploadSession:
+    try:
+        upload_session = get_session(db, session_id, current_user.id, for_update)
+    except OperationalError:
+        db.rollback()
+        raise _busy()
+    if not upload_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload_session
+
+@router.post("/", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Start a resumable upload for a form response or a message."""
+    if not RESUMABLE_UPLOADS_ENABLED:
+        # Chunks reaching another node would find no data to append to
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Resumable uploads need a shared staging directory or sticky routing (UPLOAD_STAGING_SHARED)"
+        )
+    check_extension(os.path.basename(upload.filename))
+    if upload.size > RESUMABLE_UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the maximum upload size of {RESUMABLE_UPLOAD_MAX_SIZE} bytes"
+        )
+    _check_target(db, upload, current_user)
+    check_quota(db, *file_owner(db, upload.response_id, upload.message_id), upload.size)
+
+    upload_session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        original_filename=os.path.basename(upload.filename),
+        size=upload.size,
+        response_id=upload.response_id,
+        message_id=upload.message_id,
+        expires_at=session_expiry()
+    )
+    db.add(upload_session)
+    db.commit()
+    db.refresh(upload_session)
+    return upload_session
+
+@router.get("/{session_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the progress of an upload; resume by sending data from `offset`."""
+    return _get_session(db, session_id, current_user)
+
+@router.put("/{session_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Append the request body to an upload, starting at the Upload-Offset header."""
+    upload_session = _get_session(db, session_id, current_user)
+
+    try:
+        await append_chunk(db, upload_session, upload_offset, request.stream())
+    except UploadOffsetMismatch:
+        upload_session = _get_session(db, session_id, current_user)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Offset must be {upload_session.offset}",
+            headers={"Upload-Offset": str(upload_session.offset)}
+        )
+    except UploadDataMissing as error:
+        raise _data_missing(error)
+    except UploadBusy:
+        raise _busy()
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Chunk goes past the declared upload size"
+        )
+    except ClientDisconnect:
+        # The bytes received so far are kept; the client resumes from the new offset
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    db.refresh(upload_session)
+    return upload_session
+
+def _check_complete(upload_session: UploadSession) -> None:
+    if upload_session.offset != upload_session.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete: {upload_session.offset} of {upload_session.size} bytes received",
+            headers={"Upload-Offset": str(upload_session.offset)}
+        )
+
+@router.post("/{session_id}/complete", response_model=UploadedFileResponse)
+async def complete_upload(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Finish an upload and attach it to its form response or message."""
+    upload_session = _get_session(db, session_id, current_user)
+    _check_complete(upload_session)
+
+    # Other uploads may have used up the quota since this one started
+    user_id, site_id = file_owner(db, upload_session.response_id, upload_session.message_id)
+    check_quota(db, user_id, site_id, upload_session.size)
+
+    try:
+        stored = await finalize_session(db, upload_session)
+    except UploadDataMissing as error:
+        raise _data_missing(error)
+    # Locked only once hashed, while the file is moved and the row written
+    upload_session = _get_session(db, session_id, current_user, for_update=True)
+    _check_complete(upload_session)
+    try:
+        columns = blob_columns(await run_in_threadpool(store_blob, db, stored))
+        if upload_session.response_id is not None:
+            uploaded = UploadedFile(
+                **columns,
+                original_filename=upload_session.original_filename,
+                form_response_id=upload_session.response_id,
+                user_id=user_id,
+                site_id=site_id
+            )
+        else:
+            uploaded = MessageAttachment(
+                **columns,
+                original_filename=upload_session.original_filename,
+                message_id=upload_session.message_id,
+                user_id=user_id,
+                site_id=site_id
+            )
+        db.add(uploaded)
+        db.flush()
+        check_quota(db, user_id, site_id)
+        db.delete(upload_session)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(uploaded)
+    derivative_pool.schedule(uploaded.blob_sha256, uploaded.original_filename)
+    return uploaded
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Abort an upload and discard the data received so far."""
+    upload_session = _get_session(db, session_id, current_user, for_update=True)
+    discard_session(db, upload_session)
+    db.commit()
+    return None
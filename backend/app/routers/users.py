@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
-from ..models import User, UserRole
+from ..models import User, FormResponse, UserRole
 from ..schemas import UserCreate, UserUpdate, UserResponse
 from ..auth import get_current_active_user, get_password_hash
+from ..services.responses import delete_responses
 
 router = APIRouter()
 
@@ -233,6 +234,7 @@ async def delete_user(
             detail="Users cannot delete accounts"
         )
 
+    delete_responses(db, FormResponse.user_id == user_id)
     db.delete(user)
     db.commit()
     return None
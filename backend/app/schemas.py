@@ -109,6 +109,7 @@ class SiteResponse(SiteBase):
 class FormResponse(FormBase):
     id: int
     site_id: int
+    current_version: int
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -118,7 +119,9 @@ class FormResponse(FormBase):
 class FormSubmissionResponse(BaseModel):
     id: int
     form_id: int
-    user_id: int
+    user_id: Optional[int]
+    form_version: Optional[int]
+    revision: int
     data: Dict[str, Any]
     created_at: datetime
     updated_at: Optional[datetime]
@@ -126,6 +129,78 @@ class FormSubmissionResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class FormDraftResponse(BaseModel):
+    form_id: int
+    data: Dict[str, Any]
+    updated_at: Optional[datetime]
+
+class ExportFormat(str, Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+class FormExportResponse(BaseModel):
+    id: int
+    form_id: int
+    format: ExportFormat
+    status: str
+    row_count: Optional[int]
+    size: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    completed_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+class FormSnapshotResponse(BaseModel):
+    form_id: int
+    hash: str
+    url: str
+
+class FormVersionResponse(BaseModel):
+    form_id: int
+    version: int
+    fields: Any
+    created_at: datetime
+
+class PublicFormLink(BaseModel):
+    token: str
+    form_version: int
+    expires_at: datetime
+    submit_url: str
+
+class PublicSubmissionResponse(BaseModel):
+    id: int
+    form_id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class FormResponseSearchHit(BaseModel):
+    id: int
+    user_id: Optional[int]
+    created_at: datetime
+    rank: float
+    highlights: Dict[str, str]
+
+class ChangeEvent(BaseModel):
+    id: int
+    response_id: int
+    form_id: int
+    site_id: Optional[int]
+    operation: str
+    payload: Optional[Dict[str, Any]]
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ChangeFeedResponse(BaseModel):
+    changes: List[ChangeEvent]
+    next_cursor: str
+    has_more: bool
+
 class MessageResponse(MessageBase):
     id: int
     sender_id: int
@@ -171,9 +246,47 @@ class UploadedFileResponse(BaseModel):
     id: int
     filename: str
     original_filename: str
+    size: Optional[int]
+    checksum: Optional[str]
     created_at: datetime
 
     class Config:
         orm_mode = True
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    response_id: Optional[int] = None
+    message_id: Optional[int] = None
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    original_filename: str
+    size: int
+    offset: int
+    expires_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class FormSubmissionWithFilesResponse(FormSubmissionResponse):
+    files: List[UploadedFileResponse] = []
+
+# Storage Schemas
+class StorageUsageResponse(BaseModel):
+    scope: str
+    owner_id: int
+    bytes: int
+    files: int
+    quota_bytes: Optional[int]
+
+class StorageQuotaUpdate(BaseModel):
+    # None restores the default quota
+    quota_bytes: Optional[int] = Field(None, ge=0)
+
+class UserFilesPage(BaseModel):
+    files: List[UploadedFileResponse]
+    next_cursor: Optional[int]
+    has_more: bool
+
 TicketResponse.update_forward_refs()
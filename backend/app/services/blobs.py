@@ -0,0 +1,146 @@
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import BinaryIO, Iterable, List, Optional
+import gzip
+import logging
+import os
+
+from ..models import FileBlob
+from .uploads import UPLOAD_DIR, StoredUpload, remove_files
+from .storage import cold_storage, storage
+
+TIER_HOT = "hot"
+TIER_COLD = "cold"
+
+logger = logging.getLogger(__name__)
+
+
+def blob_key(sha256: str) -> str:
+    """Sharded storage key of a blob: blobs/ab/cd/abcd...; keeps directories small."""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def derivative_key(sha256: str, variant: str) -> str:
+    """Resized variant of an image blob, stored alongside it."""
+    return f"{blob_key(sha256)}.{variant}.webp"
+
+
+def cold_key(blob: FileBlob) -> str:
+    """Key of a blob's copy on the cold tier, suffixed by its compression."""
+    return blob_key(blob.sha256) + (".gz" if blob.compression == "gzip" else "")
+
+
+def open_blob(sha256: str) -> BinaryIO:
+    """Read the content of a blob from whichever tier holds it, decompressed."""
+    try:
+        return storage.open(blob_key(sha256))
+    except FileNotFoundError:
+        pass
+    try:
+        return gzip.open(cold_storage.path(blob_key(sha256) + ".gz"), "rb")
+    except FileNotFoundError:
+        return cold_storage.open(blob_key(sha256))
+
+
+def stored_path(row) -> Optional[str]:
+    """Where the content of an uploaded_files or message_attachments row is on disk.
+
+    Works for both layouts while legacy files are migrated: blobs are located
+    from their hash, flat files from file_path or, if UPLOAD_DIR has moved
+    since they were written, from their filename under UPLOAD_DIR. Returns
+    None for blobs kept in remote storage.
+    """
+    if row.blob_sha256:
+        return storage.path(blob_key(row.blob_sha256))
+    if os.path.exists(row.file_path):
+        return row.file_path
+    return os.path.join(UPLOAD_DIR, row.filename)
+
+
+def blob_filename(blob: FileBlob) -> str:
+    """Storage key of a blob, as stored in `filename` columns."""
+    return blob_key(blob.sha256)
+
+
+def blob_columns(blob: FileBlob) -> dict:
+    """Storage columns shared by uploaded_files and message_attachments rows."""
+    return {
+        "filename": blob_filename(blob),
+        "file_path": blob.storage_path,
+        "blob_sha256": blob.sha256,
+        "size": blob.size,
+        "checksum": blob.sha256
+    }
+
+
+def store_blob(db: Session, stored: StoredUpload) -> FileBlob:
+    """Move a staged upload into the blob store, or drop it if the content is known.
+
+    The blob row is upserted in the caller's transaction and stays locked until
+    it commits, so a concurrent cleanup cannot remove it in between. Its
+    ref_count is maintained by triggers on the referencing tables.
+    """
+    key = blob_key(stored.checksum)
+    statement = insert(FileBlob).values(
+        sha256=stored.checksum,
+        size=stored.size,
+        storage_path=key
+    )
+    row = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            # No-op update, only taken to lock the existing row
+            set_={"size": statement.excluded.size}
+        ).returning(FileBlob.sha256, literal_column("xmax = 0").label("inserted"))
+    ).first()
+    blob = db.get(FileBlob, row.sha256, populate_existing=True)
+
+    # A cold blob keeps its archived copy until it is promoted back
+    if row.inserted or (blob.tier == TIER_HOT and not storage.exists(key)):
+        storage.put(key, stored.file_path)
+    else:
+        remove_files([stored.file_path])
+    return blob
+
+
+def delete_unreferenced_blobs(
+    db: Session,
+    sha256s: Optional[Iterable[str]] = None,
+    released_before: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> List[str]:
+    """Delete blobs no longer referenced, with their files; returns their hashes.
+
+    Files are unlinked before the caller commits, while the rows are still
+    locked, so an upload of the same content waits and then writes a new copy.
+    Blobs locked by a concurrent upload are skipped.
+    """
+    query = db.query(FileBlob).filter(FileBlob.ref_count <= 0)
+    if released_before is not None:
+        query = query.filter(FileBlob.released_at < released_before)
+    if sha256s is not None:
+        sha256s = list(sha256s)
+        if not sha256s:
+            return []
+        query = query.filter(FileBlob.sha256.in_(sha256s))
+    if limit is not None:
+        query = query.limit(limit)
+
+    deleted = []
+    for blob in query.with_for_update(skip_locked=True).all():
+        key = blob_key(blob.sha256)
+        try:
+            storage.delete(key)
+            if blob.tier == TIER_COLD:
+                cold_storage.delete(cold_key(blob))
+            # Image variants
+            for variant in storage.list(key + "."):
+                storage.delete(variant.key)
+        except Exception:
+            logger.exception("Could not remove blob %s", blob.sha256)
+            continue
+        db.delete(blob)
+        deleted.append(blob.sha256)
+    return deleted
@@ -0,0 +1,142 @@
+from sqlalchemy import func, select, literal, and_, or_, tuple_
+from sqlalchemy.orm import Session, aliased
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import os
+
+from ..models import Form, FormResponse, ResponseChange
+
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv("CHANGE_FEED_RETENTION_DAYS", "7"))
+CHANGE_FEED_TOMBSTONE_DAYS = int(os.getenv("CHANGE_FEED_TOMBSTONE_DAYS", "30"))
+COMPACTION_BATCH_SIZE = 5000
+
+
+def response_payload(response: FormResponse) -> Dict[str, Any]:
+    return {
+        "id": response.id,
+        "form_id": response.form_id,
+        "user_id": response.user_id,
+        "form_version": response.form_version,
+        "data": response.data,
+        "created_at": response.created_at.isoformat() if response.created_at else None,
+        "updated_at": response.updated_at.isoformat() if response.updated_at else None
+    }
+
+
+def record_change(db: Session, operation: str, response: FormResponse, site_id: Optional[int]) -> None:
+    """Append a change event in the caller's transaction."""
+    db.add(ResponseChange(
+        response_id=response.id,
+        form_id=response.form_id,
+        site_id=site_id,
+        operation=operation,
+        payload=response_payload(response) if operation != "delete" else None
+    ))
+
+
+def record_response_deletions(db: Session, *criteria) -> None:
+    """Append delete events for the responses matching criteria.
+
+    Must run before the responses are deleted (see delete_responses).
+    """
+    selection = select(
+        FormResponse.id,
+        FormResponse.form_id,
+        Form.site_id,
+        literal("delete")
+    ).join(Form, Form.id == FormResponse.form_id).where(*criteria)
+
+    db.execute(
+        ResponseChange.__table__.insert().from_select(
+            ["response_id", "form_id", "site_id", "operation"],
+            selection
+        )
+    )
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """Cursors are "<txid>.<id>"; raises ValueError for malformed ones."""
+    if not cursor:
+        return (0, 0)
+    txid, change_id = cursor.split(".", 1)
+    return (int(txid), int(change_id))
+
+
+def format_cursor(position: Tuple[int, int]) -> str:
+    return f"{position[0]}.{position[1]}"
+
+
+def list_changes(db: Session, since: Optional[str], limit: int, site_id: Optional[int] = None) -> Dict[str, Any]:
+    """Return committed change events after a cursor, in commit-safe order.
+
+    Events are ordered by (transaction id, id) and only returned once every
+    transaction that could still insert an earlier event has finished, so a
+    consumer never skips an event by advancing its cursor.
+    """
+    position = parse_cursor(since)
+
+    query = db.query(ResponseChange).filter(
+        tuple_(ResponseChange.txid, ResponseChange.id) > tuple_(position[0], position[1]),
+        ResponseChange.txid < func.txid_snapshot_xmin(func.txid_current_snapshot())
+    )
+    if site_id is not None:
+        query = query.filter(ResponseChange.site_id == site_id)
+
+    changes = query.order_by(ResponseChange.txid, ResponseChange.id).limit(limit + 1).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        position = (changes[-1].txid, changes[-1].id)
+
+    return {
+        "changes": changes,
+        "next_cursor": format_cursor(position),
+        "has_more": has_more
+    }
+
+
+def compact_changes(
+    db: Session,
+    retention_days: int = CHANGE_FEED_RETENTION_DAYS,
+    tombstone_days: int = CHANGE_FEED_TOMBSTONE_DAYS,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """Drop events superseded by a newer event for the same response.
+
+    Only events older than the retention window are compacted, so consumers that
+    are less than retention_days behind still see every intermediate change.
+    Delete events are kept as tombstones for tombstone_days.
+    """
+    now = datetime.now(timezone.utc)
+    retention_cutoff = now - timedelta(days=retention_days)
+    tombstone_cutoff = now - timedelta(days=tombstone_days)
+
+    newer = aliased(ResponseChange)
+    superseded = db.query(ResponseChange.id).filter(
+        ResponseChange.created_at < retention_cutoff,
+        db.query(newer.id).filter(
+            newer.response_id == ResponseChange.response_id,
+            or_(
+                newer.txid > ResponseChange.txid,
+                and_(newer.txid == ResponseChange.txid, newer.id > ResponseChange.id)
+            )
+        ).exists()
+    )
+    tombstones = db.query(ResponseChange.id).filter(
+        ResponseChange.operation == "delete",
+        ResponseChange.created_at < tombstone_cutoff
+    )
+
+    removed = {"superseded": 0, "tombstones": 0}
+    for key, query in (("superseded", superseded), ("tombstones", tombstones)):
+        if dry_run:
+            removed[key] = query.count()
+            continue
+        while True:
+            ids = [row.id for row in query.limit(COMPACTION_BATCH_SIZE).all()]
+            if not ids:
+                break
+            db.query(ResponseChange).filter(ResponseChange.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            removed[key] += len(ids)
+    return removed
@@ -0,0 +1,193 @@
+from fastapi import HTTPException, Request, status
+from fastapi.responses import RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import quote
+import gzip
+import mimetypes
+import os
+
+from .uploads import UPLOAD_DIR, UPLOAD_CHUNK_SIZE
+from ..models import FileBlob
+from .blobs import TIER_COLD, blob_key, cold_key, derivative_key
+from .images import derivative_pool, is_image
+from .storage import cold_storage, storage
+
+# When set (e.g. /protected-uploads/), files are handed to the fronting proxy with
+# X-Accel-Redirect: the proxy sends them with sendfile and handles Range itself
+DOWNLOAD_ACCEL_REDIRECT_PREFIX = os.getenv("DOWNLOAD_ACCEL_REDIRECT_PREFIX", "")
+DOWNLOAD_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None when the whole file should be sent (no header, another unit or
+    several ranges) and raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if any(part and not part.isdigit() for part in (start, end)) or not (start or end):
+        # Malformed ranges are ignored
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        if int(end) == 0:
+            raise ValueError("Range not satisfiable")
+        first, last = max(size - int(end), 0), size - 1
+    else:
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError("Range not satisfiable")
+    return (first, last)
+
+
+def _content_disposition(filename: str) -> str:
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+class RangeFileResponse(Response):
+    """Send a file, or one byte range of it.
+
+    Uses the ASGI zero-copy extension when the server offers it, so the bytes
+    never pass through Python; otherwise streams fixed-size chunks read off
+    the event loop. Gzip files (the cold tier) are decompressed as they are
+    streamed, start and end being offsets in the decompressed content.
+    """
+
+    def __init__(self, file_path: str, start: int, end: int, status_code: int, headers: dict, compression: Optional[str] = None):
+        super().__init__(status_code=status_code, headers=headers)
+        self.file_path = file_path
+        self.start = start
+        self.end = end
+        self.compression = compression
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        count = self.end - self.start + 1
+        opener = gzip.open if self.compression == "gzip" else open
+        buffer = await run_in_threadpool(opener, self.file_path, "rb")
+        try:
+            if not self.compression and "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopy", "file": buffer.fileno(), "offset": self.start, "count": count})
+                return
+
+            await run_in_threadpool(buffer.seek, self.start)
+            while count > 0:
+                chunk = await run_in_threadpool(buffer.read, min(UPLOAD_CHUNK_SIZE, count))
+                if not chunk:
+                    break
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await run_in_threadpool(buffer.close)
+
+
+def file_download_response(
+    request: Request,
+    file_path: Optional[str],
+    filename: str,
+    checksum: Optional[str],
+    blob: Optional[FileBlob] = None,
+    variant: Optional[str] = None
+) -> Response:
+    """Serve a stored file after the caller has checked permissions.
+
+    Blobs in remote storage are answered with a redirect to a short-lived
+    presigned URL, so their bytes never pass through the API. Local files
+    are sent with conditional (If-None-Match, If-Range) and single Range
+    request support; the ETag is the content hash when known. When an image
+    variant is asked for and already rendered it is sent instead; otherwise
+    it is queued and the original is sent. Blobs on the cold tier are read
+    from there, decompressed while streamed.
+    """
+    cache_control = DOWNLOAD_CACHE_CONTROL
+    blob_sha256 = blob.sha256 if blob else None
+    key = blob_key(blob_sha256) if blob_sha256 else None
+    compression = None
+    size = None
+    cold = blob is not None and blob.tier == TIER_COLD
+    if cold:
+        key = None
+        file_path = cold_storage.path(cold_key(blob))
+        compression = blob.compression
+        size = blob.size
+    if variant and blob_sha256 and is_image(filename):
+        if storage.exists(derivative_key(blob_sha256, variant)):
+            key = derivative_key(blob_sha256, variant)
+            file_path = storage.path(key)
+            compression = size = None
+            cold = False
+            filename = f"{os.path.splitext(filename)[0]}.{variant}.webp"
+            checksum = f"{blob_sha256}-{variant}"
+        else:
+            derivative_pool.schedule(blob_sha256, filename)
+            # Not cached, so the variant is fetched once rendered
+            cache_control = "private, no-cache"
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if key and not storage.local:
+        # The storage answers Range, conditional requests and missing objects itself
+        return RedirectResponse(
+            storage.presigned_url(key, filename, media_type),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": "private, no-store"}
+        )
+
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    if size is None:
+        size = stat.st_size
+    etag = f'"{checksum}"' if checksum else f'W/"{size:x}-{int(stat.st_mtime):x}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Content-Disposition": _content_disposition(filename),
+        "Accept-Ranges": "bytes"
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if DOWNLOAD_ACCEL_REDIRECT_PREFIX and not cold:
+        # The proxy answers Range and If-Range from the file on disk
+        relative_path = os.path.relpath(file_path, UPLOAD_DIR)
+        headers["X-Accel-Redirect"] = DOWNLOAD_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative_path)
+        return Response(media_type=media_type, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    # A Range only applies if the client's copy is still current (strong comparison)
+    if not if_range or if_range == headers["Last-Modified"] or (if_range == etag and not etag.startswith("W/")):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+    headers["Content-Type"] = media_type
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return RangeFileResponse(file_path, 0, size - 1, status.HTTP_200_OK, headers, compression)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(file_path, start, end, status.HTTP_206_PARTIAL_CONTENT, headers, compression)
@@ -0,0 +1,127 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from ..database import SessionLocal
+from ..models import FormDraft
+
+DRAFT_FLUSH_INTERVAL = float(os.getenv("DRAFT_FLUSH_INTERVAL", "10"))  # seconds
+
+logger = logging.getLogger(__name__)
+
+DraftKey = Tuple[int, int]  # (user_id, form_id)
+
+
+class DraftBuffer:
+    """Per-process buffer absorbing draft autosaves.
+
+    Autosaves only merge changed fields into memory; a background loop writes
+    each dirty draft at most once per flush interval, whatever the number of
+    edits in between. Drafts of a user are expected to reach the same worker
+    (sticky sessions); the database copy is merged, never overwritten.
+    """
+
+    def __init__(self, interval: float = DRAFT_FLUSH_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[DraftKey, Dict[str, Any]] = {}
+        self._lock = Lock()
+        # Held while pending drafts are written, so a submit never races a flush
+        self._flush_lock = Lock()
+
+    def save(self, user_id: int, form_id: int, changes: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.setdefault((user_id, form_id), {}).update(changes)
+
+    def peek(self, user_id: int, form_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._pending.get((user_id, form_id), {}))
+
+    def take(self, user_id: int, form_id: int) -> Dict[str, Any]:
+        """Remove and return the unsaved changes of a draft.
+
+        Waits for a running flush, so call it from a worker thread rather than
+        the event loop.
+        """
+        with self._flush_lock, self._lock:
+            return self._pending.pop((user_id, form_id), {})
+
+    def restore(self, user_id: int, form_id: int, changes: Dict[str, Any]) -> None:
+        """Put back changes taken for a write that failed; changes saved meanwhile are newer."""
+        if not changes:
+            return
+        with self._lock:
+            key = (user_id, form_id)
+            self._pending[key] = {**changes, **self._pending.get(key, {})}
+
+    def flush(self) -> int:
+        """Write every dirty draft in a single transaction."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            db = SessionLocal()
+            flushed = 0
+            try:
+                for (user_id, form_id), changes in pending.items():
+                    try:
+                        with db.begin_nested():
+                            upsert_draft(db, user_id, form_id, changes)
+                        flushed += 1
+                    except IntegrityError:
+                        # The form or user was deleted meanwhile: drop the draft
+                        logger.warning("Dropping draft of user %s for form %s", user_id, form_id)
+                db.commit()
+            except BaseException:
+                # Keep the drafts for the next flush
+                for (user_id, form_id), changes in pending.items():
+                    self.restore(user_id, form_id, changes)
+                raise
+            finally:
+                db.close()
+            return flushed
+
+    async def run(self) -> None:
+        """Flush pending drafts every interval until cancelled."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await loop.run_in_executor(None, self.flush)
+                except Exception:
+                    logger.exception("Could not flush drafts, retrying at the next interval")
+        except asyncio.CancelledError:
+            await loop.run_in_executor(None, self.flush)
+            raise
+
+
+def upsert_draft(db: Session, user_id: int, form_id: int, changes: Dict[str, Any]) -> None:
+    statement = insert(FormDraft).values(user_id=user_id, form_id=form_id, data=changes)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[FormDraft.user_id, FormDraft.form_id],
+        set_={
+            "data": FormDraft.data.op("||")(statement.excluded.data),
+            "updated_at": func.now()
+        }
+    ))
+
+
+def load_draft(db: Session, user_id: int, form_id: int, for_update: bool = False) -> Optional[FormDraft]:
+    query = db.query(FormDraft).filter(
+        FormDraft.user_id == user_id,
+        FormDraft.form_id == form_id
+    )
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+
+draft_buffer = DraftBuffer()
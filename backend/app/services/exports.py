@@ -0,0 +1,199 @@
+from sqlalchemy import select
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Tuple
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..database import SessionLocal
+from ..models import Form, FormExport, FormResponse
+from .form_fields import field_definitions
+from .uploads import remove_files
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+EXPORT_FORMATS = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Columns written before the fields of every export
+METADATA_COLUMNS = [
+    ("response_id", pa.int64()),
+    ("user_id", pa.int64()),
+    ("form_version", pa.int32()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value: Any) -> Any:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes", "on")
+    return bool(value)
+
+
+def _to_date(value: Any) -> Any:
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def _to_datetime(value: Any) -> Any:
+    try:
+        return datetime.fromisoformat(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _to_string(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+# Field type -> (Arrow type, converter for submitted values)
+FIELD_TYPE_COLUMNS: Dict[str, Tuple[pa.DataType, Callable[[Any], Any]]] = {
+    "number": (pa.float64(), _to_float),
+    "range": (pa.float64(), _to_float),
+    "checkbox": (pa.bool_(), _to_bool),
+    "date": (pa.date32(), _to_date),
+    "datetime": (pa.timestamp("us", tz="UTC"), _to_datetime),
+    "datetime-local": (pa.timestamp("us"), _to_datetime),
+}
+
+
+def export_columns(fields: Any) -> List[Tuple[str, str, pa.DataType, Callable[[Any], Any]]]:
+    """Typed columns (name, field id, type, converter) for the fields of a form, inferred from their types.
+
+    A field whose id is taken by a metadata column is written as `field_<id>`.
+    """
+    definitions = field_definitions(fields)
+    metadata = {name for name, _ in METADATA_COLUMNS}
+    taken = metadata | {field["id"] for field in definitions}
+    columns = []
+    for field in definitions:
+        arrow_type, converter = FIELD_TYPE_COLUMNS.get(field.get("type"), (pa.string(), _to_string))
+        name = field["id"]
+        if name in metadata:
+            while name in taken:
+                name = f"field_{name}"
+            taken.add(name)
+        columns.append((name, field["id"], arrow_type, converter))
+    return columns
+
+
+def export_schema(columns: List[Tuple[str, str, pa.DataType, Callable[[Any], Any]]]) -> pa.Schema:
+    return pa.schema(METADATA_COLUMNS + [(name, arrow_type) for name, _, arrow_type, _ in columns])
+
+
+def _record_batch(rows, columns, schema: pa.Schema) -> pa.RecordBatch:
+    data = {
+        "response_id": [row.id for row in rows],
+        "user_id": [row.user_id for row in rows],
+        "form_version": [row.form_version for row in rows],
+        "created_at": [row.created_at for row in rows],
+    }
+    for name, field_id, _, converter in columns:
+        data[name] = [converter((row.data or {}).get(field_id)) for row in rows]
+    return pa.RecordBatch.from_pydict(data, schema=schema)
+
+
+def run_export(export_id: int) -> None:
+    """Write a form's responses to a columnar file.
+
+    Responses are read through a server-side cursor and written one row group
+    per batch, so memory use is bounded by EXPORT_BATCH_SIZE whatever the number
+    of responses.
+    """
+    db = SessionLocal()
+    tmp_path = None
+    try:
+        export = db.query(FormExport).filter(FormExport.id == export_id).first()
+        if not export:
+            return
+        form = db.query(Form).filter(Form.id == export.form_id).first()
+
+        export.status = "running"
+        db.commit()
+
+        extension, _ = EXPORT_FORMATS[export.format]
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        file_path = os.path.join(EXPORT_DIR, f"form_{form.id}_export_{export.id}.{extension}")
+        tmp_path = f"{file_path}.tmp"
+
+        columns = export_columns(form.fields)
+        schema = export_schema(columns)
+        if export.format == "parquet":
+            writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+
+            def write_batch(batch: pa.RecordBatch) -> None:
+                # One row group per batch
+                writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            sink = pa.OSFile(tmp_path, "wb")
+            writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            write_batch = writer.write_batch
+
+        row_count = 0
+        try:
+            statement = select(
+                FormResponse.id,
+                FormResponse.user_id,
+                FormResponse.form_version,
+                FormResponse.created_at,
+                FormResponse.data
+            ).where(
+                FormResponse.form_id == form.id
+            ).order_by(
+                FormResponse.created_at,
+                FormResponse.id
+            ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+            for partition in db.execute(statement).partitions():
+                write_batch(_record_batch(partition, columns, schema))
+                row_count += len(partition)
+        finally:
+            writer.close()
+            if export.format != "parquet":
+                sink.close()
+
+        os.replace(tmp_path, file_path)
+
+        export.status = "completed"
+        export.file_path = file_path
+        export.row_count = row_count
+        export.size = os.path.getsize(file_path)
+        export.completed_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Export %s failed", export_id)
+        if tmp_path:
+            remove_files([tmp_path])
+        export = db.query(FormExport).filter(FormExport.id == export_id).first()
+        if export:
+            export.status = "failed"
+            export.error = str(e)
+            db.commit()
+    finally:
+        db.close()
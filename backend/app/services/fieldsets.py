@@ -0,0 +1,68 @@
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, noload, selectinload
+from typing import Any, Callable, Dict, List, Optional, Set, Type
+
+
+def _names(value: Optional[str]) -> Set[str]:
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+
+def resolve_fieldset(schema: Type[BaseModel], fields: Optional[str], exclude: Optional[str]) -> Optional[List[str]]:
+    """Attributes of schema selected by comma-separated `fields` and `exclude`.
+
+    Returns None when neither is given, i.e. the full representation. Raises
+    ValueError for names that are not part of the schema.
+    """
+    if not fields and not exclude:
+        return None
+
+    known = list(schema.model_fields)
+    requested = _names(fields) or set(known)
+    excluded = _names(exclude)
+    unknown = (requested | excluded) - set(known)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # Keep the schema order so sparse and full payloads look alike
+    return [name for name in known if name in requested and name not in excluded]
+
+
+def fieldset_options(model, fieldset: List[str]) -> list:
+    """Loader options restricting a query on model to the selected attributes.
+
+    Unselected columns are left out of the SELECT and unselected relationships
+    are never loaded; selected collections are fetched in one extra query.
+    """
+    mapper = inspect(model)
+    primary_key = [column.key for column in mapper.primary_key]
+    columns = [
+        getattr(model, name) for name in mapper.column_attrs.keys()
+        if name in fieldset or name in primary_key
+    ]
+    options = [load_only(*columns)]
+    for name in mapper.relationships.keys():
+        relationship = getattr(model, name)
+        options.append(selectinload(relationship) if name in fieldset else noload(relationship))
+    return options
+
+
+def serialize_fieldset(
+    instance: Any,
+    fieldset: List[str],
+    nested: Optional[Dict[str, Type[BaseModel]]] = None,
+    converters: Optional[Dict[str, Callable[[Any], Any]]] = None
+) -> Dict[str, Any]:
+    """JSON-compatible dict of the selected attributes of an ORM instance."""
+    nested = nested or {}
+    converters = converters or {}
+    data = {}
+    for name in fieldset:
+        value = getattr(instance, name)
+        if name in nested:
+            value = [nested[name].from_orm(item).dict() for item in value]
+        elif name in converters:
+            value = converters[name](value)
+        data[name] = value
+    return jsonable_encoder(data)
@@ -0,0 +1,22 @@
+from typing import Any, Dict, List
+import json
+
+
+def field_definitions(fields: Any) -> List[Dict[str, Any]]:
+    """Return the list of field definitions stored in Form.fields.
+
+    Form.fields holds a JSON-encoded string, either a list of field definitions
+    or an object with a "fields" list or definitions keyed by field id.
+    """
+    if isinstance(fields, str):
+        fields = json.loads(fields)
+    if isinstance(fields, dict):
+        if isinstance(fields.get("fields"), list):
+            fields = fields["fields"]
+        else:
+            fields = [
+                {"id": field_id, **definition}
+                for field_id, definition in fields.items()
+                if isinstance(definition, dict)
+            ]
+    return [field for field in fields or [] if isinstance(field, dict) and "id" in field]
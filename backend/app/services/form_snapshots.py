@@ -0,0 +1,66 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import tempfile
+
+from ..models import Form
+
+FORM_SNAPSHOT_DIR = os.getenv("FORM_SNAPSHOT_DIR", "./static/forms")
+FORM_SNAPSHOT_URL = "/static/forms"
+
+
+def form_definition(form: Form) -> Dict[str, Any]:
+    """Serializable definition of a form as rendered by the frontend."""
+    fields = form.fields
+    return {
+        "id": form.id,
+        "site_id": form.site_id,
+        "title": form.title,
+        "description": form.description,
+        "version": form.current_version,
+        "fields": json.loads(fields) if isinstance(fields, str) else fields
+    }
+
+
+def snapshot_url(snapshot_hash: str) -> str:
+    return f"{FORM_SNAPSHOT_URL}/{snapshot_hash}.json"
+
+
+def snapshot_path(snapshot_hash: str) -> str:
+    return os.path.join(FORM_SNAPSHOT_DIR, f"{snapshot_hash}.json")
+
+
+def write_form_snapshot(form: Form) -> str:
+    """Write the form definition to a content-addressed JSON file.
+
+    Returns the content hash, which is also stored on the form. Files are never
+    rewritten, so they can be cached by clients and proxies indefinitely;
+    the storage reconciler removes those no form points to anymore.
+    """
+    content = json.dumps(form_definition(form), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    snapshot_hash = hashlib.sha256(content).hexdigest()[:32]
+
+    os.makedirs(FORM_SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(snapshot_hash)
+    try:
+        # Reused: mark it recent so the reconciler leaves it alone
+        os.utime(path)
+    except FileNotFoundError:
+        fd, tmp_path = tempfile.mkstemp(dir=FORM_SNAPSHOT_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as snapshot:
+            snapshot.write(content)
+        os.replace(tmp_path, path)
+
+    form.snapshot_hash = snapshot_hash
+    return snapshot_hash
+
+
+def remove_form_snapshot(snapshot_hash: Optional[str]) -> None:
+    """Remove a deleted form's current snapshot; older ones are left to the reconciler."""
+    if snapshot_hash is None:
+        return
+    try:
+        os.remove(snapshot_path(snapshot_hash))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,77 @@
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+
+from ..models import Form, FormVersion
+
+FORM_VERSION_CACHE_SIZE = int(os.getenv("FORM_VERSION_CACHE_SIZE", "1024"))
+
+# Versions never change once written, so cached entries are never invalidated
+_cache: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+_cache_lock = Lock()
+
+
+def create_form_version(db: Session, form: Form) -> FormVersion:
+    """Snapshot the current fields of a form as its next immutable version.
+
+    The form row is locked until commit, so concurrent updates of the same
+    form number their versions one after the other.
+    """
+    db.query(Form.id).filter(Form.id == form.id).with_for_update().one()
+    latest = db.query(FormVersion.version).filter(
+        FormVersion.form_id == form.id
+    ).order_by(FormVersion.version.desc()).limit(1).scalar()
+
+    version = FormVersion(
+        form_id=form.id,
+        version=(latest or 0) + 1,
+        fields=form.fields
+    )
+    db.add(version)
+    form.current_version = version.version
+    return version
+
+
+def get_form_version(db: Session, form_id: int, version: int) -> Optional[Dict[str, Any]]:
+    """Return a form version, served from the in-process cache when possible."""
+    key = (form_id, version)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    row = db.query(FormVersion, Form.site_id).join(
+        Form, Form.id == FormVersion.form_id
+    ).filter(
+        FormVersion.form_id == form_id,
+        FormVersion.version == version
+    ).first()
+    if row is None:
+        return None
+
+    form_version, site_id = row
+    fields = form_version.fields
+    entry = {
+        "form_id": form_version.form_id,
+        "site_id": site_id,
+        "version": form_version.version,
+        "fields": json.loads(fields) if isinstance(fields, str) else fields,
+        "created_at": form_version.created_at
+    }
+
+    with _cache_lock:
+        _cache[key] = entry
+        while len(_cache) > FORM_VERSION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def forget_form(form_id: int) -> None:
+    """Drop cached versions of a deleted form."""
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == form_id]:
+            del _cache[key]
@@ -0,0 +1,249 @@
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+from ..database import SessionLocal
+from ..models import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# A key in progress is held this long past its last renewal; a retry takes over a worker that died
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH"}
+# Response headers worth replaying; the rest are recomputed by the server
+REPLAYED_HEADERS = {b"content-type", b"etag", b"location"}
+
+logger = logging.getLogger(__name__)
+
+
+def _lease_end(lease_seconds: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+
+
+def claim_key(
+    db: Session,
+    key: str,
+    token: str,
+    ttl_hours: int = IDEMPOTENCY_KEY_TTL_HOURS,
+    lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS
+) -> Optional[IdempotencyKey]:
+    """Reserve a key for a new request, leased to `token`.
+
+    Returns None when the key was free and is now held by the caller, or the
+    existing row (in progress or completed) otherwise. Expired rows are reused,
+    and so are rows in progress whose lease lapsed: the request holding them
+    died without completing or releasing the key.
+    """
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at < func.now()
+    ))
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=ttl_hours)
+    locked_until = _lease_end(lease_seconds)
+    statement = insert(IdempotencyKey).values(
+        key=key, expires_at=expires_at, locked_until=locked_until, lock_token=token
+    )
+    claimed = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={"expires_at": expires_at, "locked_until": locked_until, "lock_token": token},
+            where=IdempotencyKey.status_code.is_(None) & (IdempotencyKey.locked_until < func.now())
+        ).returning(IdempotencyKey.key)
+    ).scalar()
+    db.commit()
+    if claimed:
+        return None
+    return db.execute(select(IdempotencyKey).where(IdempotencyKey.key == key)).scalar()
+
+
+def renew_key(db: Session, key: str, token: str, lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS) -> bool:
+    """Extend the lease of a key in progress; False if it is no longer held by token."""
+    renewed = db.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.lock_token == token,
+        IdempotencyKey.status_code.is_(None)
+    ).update({"locked_until": _lease_end(lease_seconds)}, synchronize_session=False)
+    db.commit()
+    return bool(renewed)
+
+
+def complete_key(
+    db: Session,
+    key: str,
+    token: str,
+    request_hash: str,
+    status_code: int,
+    headers: List[Tuple[str, str]],
+    body: bytes
+) -> None:
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.lock_token == token
+    ).update({
+        "request_hash": request_hash,
+        "status_code": status_code,
+        "headers": headers,
+        "body": body,
+        "locked_until": None
+    }, synchronize_session=False)
+    db.commit()
+
+
+def release_key(db: Session, key: str, token: str) -> None:
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.lock_token == token
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def purge_expired_keys(db: Session, dry_run: bool = False) -> int:
+    query = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < func.now())
+    if dry_run:
+        return query.count()
+    removed = query.delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def _with_session(function, *args):
+    db = SessionLocal()
+    try:
+        return function(db, *args)
+    finally:
+        db.close()
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[bytes]:
+    for header_name, value in scope["headers"]:
+        if header_name == name:
+            return value
+    return None
+
+
+async def _hold_lease(key: str, token: str) -> None:
+    """Renew a key's lease until cancelled, while its request runs."""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_LEASE_SECONDS / 3)
+        try:
+            if not await run_in_threadpool(_with_session, renew_key, key, token):
+                return
+        except Exception:
+            logger.exception("Could not renew the lease of an idempotency key")
+
+
+async def _json_response(send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Replay the stored response of write requests retried with the same Idempotency-Key.
+
+    Keys are scoped to the caller's credentials. The first request holds the
+    key while it runs, renewing a short lease so that a retry can take the
+    key over if the worker dies; a concurrent retry gets 409 and a retry after a
+    successful (2xx) response gets the original response back without running
+    the endpoint again. Other responses release the key so the request can be
+    retried. Request bodies are hashed as they stream, never buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = _header(scope, b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > 255:
+            await _json_response(send, 400, "Idempotency-Key is too long")
+            return
+
+        credentials = _header(scope, b"authorization") or b""
+        key = hashlib.sha256(credentials + b"\0" + idempotency_key).hexdigest()
+
+        request_hash = hashlib.sha256(
+            f"{scope['method']} {scope['path']}\0".encode() + scope.get("query_string", b"") + b"\0"
+        )
+
+        async def hashing_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_hash.update(message.get("body", b""))
+            return message
+
+        token = uuid.uuid4().hex
+        existing = await run_in_threadpool(_with_session, claim_key, key, token)
+        if existing is not None:
+            await self._replay(existing, hashing_receive, request_hash, send)
+            return
+
+        response: Dict[str, Any] = {"status": None, "headers": [], "body": []}
+
+        async def capturing_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        lease = asyncio.ensure_future(_hold_lease(key, token))
+        try:
+            await self.app(scope, hashing_receive, capturing_send)
+        except BaseException:
+            await run_in_threadpool(_with_session, release_key, key, token)
+            raise
+        finally:
+            lease.cancel()
+
+        if response["status"] is not None and 200 <= response["status"] < 300:
+            headers = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in response["headers"]
+                if name.lower() in REPLAYED_HEADERS
+            ]
+            await run_in_threadpool(
+                _with_session, complete_key, key, token, request_hash.hexdigest(),
+                response["status"], headers, b"".join(response["body"])
+            )
+        else:
+            await run_in_threadpool(_with_session, release_key, key, token)
+
+    async def _replay(self, existing: IdempotencyKey, receive, request_hash, send) -> None:
+        if existing.status_code is None:
+            await _json_response(send, 409, "A request with this Idempotency-Key is in progress")
+            return
+
+        # Consume the retried body so it can be compared with the original one
+        while True:
+            message = await receive()
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        if request_hash.hexdigest() != existing.request_hash:
+            await _json_response(send, 422, "Idempotency-Key was already used for a different request")
+            return
+
+        body = existing.body or b""
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in existing.headers or []]
+        headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": existing.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
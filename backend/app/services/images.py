@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Optional, Set
+import logging
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+from .blobs import derivative_key, open_blob
+from .storage import storage
+from .uploads import UPLOAD_STAGING_DIR
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Variant name -> longest side in pixels
+IMAGE_VARIANTS: Dict[str, int] = {
+    "thumbnail": int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256")),
+    "preview": int(os.getenv("IMAGE_PREVIEW_SIZE", "1280")),
+}
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", "1000"))
+
+logger = logging.getLogger(__name__)
+
+
+def is_image(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+
+
+def render_derivatives(sha256: str) -> None:
+    """Write the missing web-optimized variants of an image next to its blob.
+
+    Cold blobs are read from the cold tier; the variants stay hot.
+    """
+    missing = {
+        variant: max_size for variant, max_size in IMAGE_VARIANTS.items()
+        if not storage.exists(derivative_key(sha256, variant))
+    }
+    if not missing:
+        return
+
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    with open_blob(sha256) as source, Image.open(source) as image:
+        # Let the JPEG decoder downscale while decoding, far cheaper than a full decode
+        largest = max(missing.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        for variant, max_size in sorted(missing.items(), key=lambda item: -item[1]):
+            variant_image = image.copy()
+            variant_image.thumbnail((max_size, max_size), Image.LANCZOS)
+            # Rendered locally, then handed to the storage in one piece
+            tmp_path = os.path.join(UPLOAD_STAGING_DIR, f"{uuid.uuid4().hex}.{variant}.webp")
+            try:
+                variant_image.save(tmp_path, "WEBP", quality=IMAGE_QUALITY, method=4)
+                storage.put(derivative_key(sha256, variant), tmp_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+class DerivativePool:
+    """Bounded pool of threads rendering image derivatives in the background.
+
+    At most IMAGE_QUEUE_SIZE images wait at a time; beyond that new images are
+    skipped and queued again when a variant is first requested. An image is
+    never queued twice.
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS, queue_size: int = IMAGE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-derivatives")
+        self._pending: Set[str] = set()
+        self._lock = Lock()
+
+    def schedule(self, sha256: Optional[str], filename: str) -> bool:
+        if not sha256 or not is_image(filename):
+            return False
+        with self._lock:
+            if sha256 in self._pending or len(self._pending) >= self.queue_size:
+                return False
+            self._pending.add(sha256)
+        self._executor.submit(self._render, sha256)
+        return True
+
+    def _render(self, sha256: str) -> None:
+        try:
+            render_derivatives(sha256)
+        except Exception:
+            logger.exception("Could not render derivatives of %s", sha256)
+        finally:
+            with self._lock:
+                self._pending.discard(sha256)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+derivative_pool = DerivativePool()
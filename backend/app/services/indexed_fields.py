@@ -0,0 +1,163 @@
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+import os
+
+from ..database import SessionLocal
+from ..models import Form, FormResponse, FormResponseValue
+from .form_fields import field_definitions
+
+INDEX_BACKFILL_BATCH_SIZE = int(os.getenv("INDEX_BACKFILL_BATCH_SIZE", "500"))
+
+NUMBER_FIELD_TYPES = {"number", "range"}
+DATE_FIELD_TYPES = {"date", "datetime", "datetime-local"}
+
+
+def indexed_fields(fields: Any) -> Dict[str, str]:
+    """Map each field flagged as indexed to the value column it is stored in."""
+    columns = {}
+    for field in field_definitions(fields):
+        if not field.get("indexed"):
+            continue
+        if field.get("type") in NUMBER_FIELD_TYPES:
+            columns[field["id"]] = "value_number"
+        elif field.get("type") in DATE_FIELD_TYPES:
+            columns[field["id"]] = "value_date"
+        else:
+            columns[field["id"]] = "value_text"
+    return columns
+
+
+def typed_value(column: str, value: Any) -> Optional[Any]:
+    """Convert a submitted value to the type of its value column.
+
+    Returns None for values that can't be indexed (missing, nested, unparsable).
+    """
+    if value is None or isinstance(value, (list, dict)):
+        return None
+    try:
+        if column == "value_number":
+            if isinstance(value, bool):
+                return None
+            return Decimal(str(value))
+        if column == "value_date":
+            return datetime.fromisoformat(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _value_rows(form_id: int, columns: Dict[str, str], responses: Iterable[FormResponse]) -> List[Dict[str, Any]]:
+    rows = []
+    for response in responses:
+        data = response.data or {}
+        for field_id, column in columns.items():
+            value = typed_value(column, data.get(field_id))
+            if value is None:
+                continue
+            rows.append({
+                "response_id": response.id,
+                "response_created_at": response.created_at,
+                "form_id": form_id,
+                "field_id": field_id,
+                column: value
+            })
+    return rows
+
+
+def _insert_values(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # Rows differ in which value column they set, so insert them one shape at a time
+    by_column: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        column = next(key for key in row if key.startswith("value_"))
+        by_column.setdefault(column, []).append(row)
+    for column_rows in by_column.values():
+        db.execute(
+            insert(FormResponseValue).values(column_rows).on_conflict_do_nothing()
+        )
+
+
+def index_response(db: Session, form_id: int, fields: Any, response: FormResponse) -> None:
+    """Store the indexed field values of a freshly flushed response."""
+    columns = indexed_fields(fields)
+    if not columns:
+        return
+    rows = _value_rows(form_id, columns, [response])
+    if rows:
+        _insert_values(db, rows)
+
+
+def reindex_response(db: Session, form_id: int, fields: Any, response: FormResponse, field_ids: Iterable[str]) -> None:
+    """Refresh the stored values of the given fields after a response changed."""
+    field_ids = set(field_ids)
+    columns = {
+        field_id: column
+        for field_id, column in indexed_fields(fields).items()
+        if field_id in field_ids
+    }
+    if not columns:
+        return
+    db.query(FormResponseValue).filter(
+        FormResponseValue.response_id == response.id,
+        FormResponseValue.field_id.in_(list(columns))
+    ).delete(synchronize_session=False)
+    rows = _value_rows(form_id, columns, [response])
+    if rows:
+        _insert_values(db, rows)
+
+
+def drop_field_values(db: Session, form_id: int, field_ids: Iterable[str]) -> None:
+    """Remove stored values of fields that are no longer indexed."""
+    field_ids = list(field_ids)
+    if not field_ids:
+        return
+    db.query(FormResponseValue).filter(
+        FormResponseValue.form_id == form_id,
+        FormResponseValue.field_id.in_(field_ids)
+    ).delete(synchronize_session=False)
+
+
+def backfill_indexed_fields(form_id: int, field_ids: List[str], batch_size: int = INDEX_BACKFILL_BATCH_SIZE) -> int:
+    """Extract values of newly indexed fields from existing responses, in batches.
+
+    Runs outside the request with its own session; each batch is committed so
+    progress survives interruptions and locks stay short.
+    """
+    db = SessionLocal()
+    indexed = 0
+    try:
+        form = db.query(Form).filter(Form.id == form_id).first()
+        if not form:
+            return 0
+        columns = {
+            field_id: column
+            for field_id, column in indexed_fields(form.fields).items()
+            if field_id in field_ids
+        }
+        if not columns:
+            return 0
+
+        last_id = 0
+        while True:
+            responses = db.query(FormResponse).filter(
+                FormResponse.form_id == form_id,
+                FormResponse.id > last_id
+            ).order_by(FormResponse.id).limit(batch_size).all()
+            if not responses:
+                break
+
+            rows = _value_rows(form_id, columns, responses)
+            if rows:
+                _insert_values(db, rows)
+            db.commit()
+
+            indexed += len(responses)
+            last_id = responses[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+    return indexed
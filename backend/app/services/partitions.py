@@ -0,0 +1,182 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import List, Optional
+import csv
+import gzip
+import os
+import re
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "./archives")
+
+PARTITION_NAME_PATTERN = re.compile(r"^form_responses_(\d{4})_(\d{2})$")
+
+
+def _partition_month(name: str) -> Optional[datetime]:
+    """Return the first day of the month covered by a partition name."""
+    match = PARTITION_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """Create monthly partitions for the current month and the upcoming ones."""
+    created = db.execute(
+        text("SELECT ensure_form_responses_partitions(:months_ahead)"),
+        {"months_ahead": months_ahead}
+    ).scalar()
+    db.commit()
+    return created
+
+
+def list_partitions(db: Session) -> List[str]:
+    """List partitions currently attached to form_responses, oldest first."""
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = 'form_responses'
+        ORDER BY child.relname
+    """)).scalars().all()
+    return list(rows)
+
+
+def _copy_columns(db: Session, table: str) -> List[str]:
+    """Columns COPY can write to, in table order (generated columns excluded)."""
+    rows = db.execute(text("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {"table": table}).scalars().all()
+    return list(rows)
+
+
+def _column_list(columns: List[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _dump(db: Session, table: str, path: str, where: str = "") -> None:
+    """Write a table, or the rows matching `where`, to a gzip CSV archive whose header names the columns.
+
+    The archive is written next to its final path, fsynced and renamed, so a
+    complete archive exists before anything is removed from the database.
+    """
+    tmp_path = f"{path}.tmp"
+    columns = _column_list(_copy_columns(db, table))
+    cursor = db.connection().connection.cursor()
+    try:
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                cursor.copy_expert(
+                    f'COPY (SELECT {columns} FROM "{table}" {where}) TO STDOUT WITH (FORMAT csv, HEADER true)',
+                    archive
+                )
+            raw.flush()
+            os.fsync(raw.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cursor.close()
+    os.replace(tmp_path, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _load(db: Session, table: str, path: str) -> None:
+    """Load a gzip CSV archive into a table, by the column names of its header.
+
+    Columns added to the table since the archive was written get their default.
+    """
+    cursor = db.connection().connection.cursor()
+    try:
+        with gzip.open(path, "rb") as archive:
+            header = next(csv.reader([archive.readline().decode("utf-8")]))
+            cursor.copy_expert(f'COPY "{table}" ({_column_list(header)}) FROM STDIN WITH (FORMAT csv)', archive)
+    finally:
+        cursor.close()
+
+
+def archive_partitions(
+    db: Session,
+    older_than_months: int,
+    archive_dir: str = PARTITION_ARCHIVE_DIR,
+    dry_run: bool = False
+) -> List[str]:
+    """Dump partitions older than the cutoff to gzip archives, then drop them.
+
+    Each partition is locked against writes, dumped while still attached, and
+    only detached and dropped once its archive is on disk, all in one
+    transaction: a failed dump leaves the partition in place. The indexed
+    values of its responses reference it, so they are archived alongside and
+    removed first.
+    """
+    current_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    cutoff = _add_months(current_month, -older_than_months)
+
+    archived = []
+    for name in list_partitions(db):
+        month = _partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        archived.append(name)
+        if dry_run:
+            continue
+
+        os.makedirs(archive_dir, exist_ok=True)
+        # Values carry the created_at of their response, so the partition bounds select them
+        values_filter = (
+            f"WHERE response_created_at >= '{month.isoformat()}' "
+            f"AND response_created_at < '{_add_months(month, 1).isoformat()}'"
+        )
+        try:
+            # Reads go on; writes wait until the partition is gone
+            db.execute(text(f'LOCK TABLE "{name}" IN EXCLUSIVE MODE'))
+            _dump(db, name, os.path.join(archive_dir, f"{name}.csv.gz"))
+            _dump(db, "form_response_values", os.path.join(archive_dir, f"{name}.values.csv.gz"), where=values_filter)
+            db.execute(text(f"DELETE FROM form_response_values {values_filter}"))
+            db.execute(text(f'ALTER TABLE form_responses DETACH PARTITION "{name}"'))
+            db.execute(text(f'DROP TABLE "{name}"'))
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    return archived
+
+
+def restore_partition(db: Session, name: str, archive_dir: str = PARTITION_ARCHIVE_DIR) -> str:
+    """Load an archived partition back and re-attach it so it can be queried."""
+    month = _partition_month(name)
+    if month is None:
+        raise ValueError(f"Invalid partition name: {name}")
+
+    archive_path = os.path.join(archive_dir, f"{name}.csv.gz")
+    if not os.path.exists(archive_path):
+        raise FileNotFoundError(archive_path)
+
+    db.execute(text(f'CREATE TABLE "{name}" (LIKE form_responses INCLUDING DEFAULTS INCLUDING GENERATED)'))
+    _load(db, name, archive_path)
+
+    db.execute(
+        text(f'ALTER TABLE form_responses ATTACH PARTITION "{name}" FOR VALUES FROM (:start) TO (:end)'),
+        {"start": month, "end": _add_months(month, 1)}
+    )
+    values_path = os.path.join(archive_dir, f"{name}.values.csv.gz")
+    if os.path.exists(values_path):
+        _load(db, "form_response_values", values_path)
+    db.commit()
+    return name
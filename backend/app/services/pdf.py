@@ -3,13 +3,26 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from typing import BinaryIO
 import json
 import os
-from datetime import datetime
+import uuid
 
 from ..models import Form, FormResponse, User, Site
+from .pdf_cache import lookup_pdf, pdf_digest, store_pdf
+from .uploads import UPLOAD_STAGING_DIR
+
+# Part of every cache key: bump when the layout below changes
+PDF_TEMPLATE_VERSION = 1
 
 class PDFGenerator:
+    """Renders PDFs through the content cache.
+
+    The generate methods return the PDF as an open binary file, which the
+    caller closes. Rendering and the cache's storage calls block, so async
+    code should call them with run_in_threadpool.
+    """
+
     def __init__(self):
         self.styles = getSampleStyleSheet()
         # Create custom styles
@@ -26,16 +39,28 @@ class PDFGenerator:
             spaceAfter=10
         ))
 
-    def generate_form_response_pdf(self, form: Form, response: FormResponse, user: User, site: Site) -> str:
-        """Generate PDF for a form response."""
-        # Create output directory if it doesn't exist
-        output_dir = os.path.join(os.getenv("UPLOAD_DIR", "./uploads"), "pdfs")
-        os.makedirs(output_dir, exist_ok=True)
+    def _staging_path(self) -> str:
+        # Rendered locally, then handed to the cache
+        os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+        return os.path.join(UPLOAD_STAGING_DIR, f"{uuid.uuid4().hex}.pdf")
+
+    def generate_form_response_pdf(self, form: Form, response: FormResponse, user: User, site: Site) -> BinaryIO:
+        """Generate PDF for a form response; returns it opened.
+
+        Cached by content: the same response, schema, form, user and site give
+        back the stored PDF without rendering.
+        """
+        # Render against the schema the response was submitted under
+        fields = response.version.fields if response.version else form.fields
+        digest = pdf_digest(
+            "form_response", PDF_TEMPLATE_VERSION, site.name, form.title, form.description,
+            fields, response.data, user.username, user.email, response.created_at
+        )
+        cached = lookup_pdf(digest)
+        if cached is not None:
+            return cached
 
-        # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"form_response_{response.id}_{timestamp}.pdf"
-        filepath = os.path.join(output_dir, filename)
+        filepath = self._staging_path()
 
         # Create PDF document
         doc = SimpleDocTemplate(
@@ -82,8 +107,8 @@ class PDFGenerator:
         # Add form responses
         content.append(Paragraph("Form Responses", self.styles['SectionHeader']))
 
-        form_fields = json.loads(form.fields)
-        form_data = json.loads(response.data)
+        form_fields = json.loads(fields)
+        form_data = response.data
 
         response_data = []
         for field in form_fields:
@@ -116,19 +141,28 @@ class PDFGenerator:
         content.append(responses_table)
 
         # Build PDF
-        doc.build(content)
-        return filepath
-
-    def generate_responses_summary_pdf(self, form: Form, responses: list[FormResponse], site: Site) -> str:
-        """Generate a summary PDF for all responses to a form."""
-        # Create output directory if it doesn't exist
-        output_dir = os.path.join(os.getenv("UPLOAD_DIR", "./uploads"), "pdfs")
-        os.makedirs(output_dir, exist_ok=True)
+        try:
+            doc.build(content)
+        except BaseException:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        return store_pdf(digest, filepath)
+
+    def generate_responses_summary_pdf(self, form: Form, responses: list[FormResponse], site: Site) -> BinaryIO:
+        """Generate a summary PDF for all responses to a form; returns it opened (cached by content)."""
+        digest = pdf_digest(
+            "responses_summary", PDF_TEMPLATE_VERSION, site.name, form.title, form.description, form.fields,
+            [
+                (response.id, response.created_at, response.version.fields if response.version else None, response.data)
+                for response in responses
+            ]
+        )
+        cached = lookup_pdf(digest)
+        if cached is not None:
+            return cached
 
-        # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"form_summary_{form.id}_{timestamp}.pdf"
-        filepath = os.path.join(output_dir, filename)
+        filepath = self._staging_path()
 
         # Create PDF document
         doc = SimpleDocTemplate(
@@ -170,11 +204,12 @@ class PDFGenerator:
         content.append(Spacer(1, 20))
 
         # Process responses
-        form_fields = json.loads(form.fields)
+        current_fields = json.loads(form.fields)
 
         for response in responses:
             content.append(Paragraph(f"Response #{response.id}", self.styles['SectionHeader']))
-            response_data = json.loads(response.data)
+            form_fields = json.loads(response.version.fields) if response.version else current_fields
+            response_data = response.data
             table_data = []
 
             for field in form_fields:
@@ -207,5 +242,10 @@ class PDFGenerator:
             content.append(Spacer(1, 20))
 
         # Build PDF
-        doc.build(content)
-        return filepath
+        try:
+            doc.build(content)
+        except BaseException:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        return store_pdf(digest, filepath)
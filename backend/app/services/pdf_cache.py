@@ -0,0 +1,111 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from typing import Any, BinaryIO, Optional
+import hashlib
+import json
+import logging
+import os
+
+from ..database import SessionLocal
+from ..models import PdfCacheEntry
+from .storage import storage
+
+# Bytes of rendered PDFs kept; least recently used ones are evicted beyond it
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", "1073741824"))
+PDF_CACHE_EVICT_BATCH = 100
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_digest(*parts: Any) -> str:
+    """Hash of everything a PDF shows; equal inputs render the same document."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def pdf_key(digest: str) -> str:
+    return f"pdfs/{digest}.pdf"
+
+
+def lookup_pdf(digest: str) -> Optional[BinaryIO]:
+    """Open the cached PDF, or return None if it has to be rendered.
+
+    The entry is locked while the file is opened, so eviction skips it; the
+    open file stays readable if it is evicted afterwards. The cache runs in
+    its own session, leaving the caller's transaction alone.
+    """
+    db = SessionLocal()
+    try:
+        entry = db.query(PdfCacheEntry).filter(PdfCacheEntry.digest == digest).with_for_update().first()
+        if entry is None:
+            return None
+        try:
+            cached = storage.open(pdf_key(digest))
+        except FileNotFoundError:
+            db.delete(entry)
+            db.commit()
+            return None
+        entry.last_accessed_at = func.now()
+        db.commit()
+        return cached
+    finally:
+        db.close()
+
+
+def store_pdf(digest: str, file_path: str) -> BinaryIO:
+    """Move a rendered PDF into the cache and evict beyond the budget; returns it opened.
+
+    Like lookup_pdf, runs in its own session.
+    """
+    size = os.path.getsize(file_path)
+    # Opened before the move, so a concurrent eviction cannot take it from the caller
+    rendered = open(file_path, "rb")
+    db = SessionLocal()
+    try:
+        storage.put(pdf_key(digest), file_path)
+        statement = insert(PdfCacheEntry).values(digest=digest, size=size)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[PdfCacheEntry.digest],
+            set_={"size": statement.excluded.size, "last_accessed_at": func.now()}
+        ))
+        db.commit()
+        evict_pdfs(db, keep=digest)
+    except BaseException:
+        rendered.close()
+        raise
+    finally:
+        db.close()
+    return rendered
+
+
+def evict_pdfs(db: Session, max_bytes: int = PDF_CACHE_MAX_BYTES, keep: Optional[str] = None) -> int:
+    """Delete the least recently used PDFs until the cache fits max_bytes; returns how many.
+
+    Entries locked by a lookup opening them or by a concurrent eviction are
+    skipped, and so is `keep`, the PDF just rendered for the caller.
+    """
+    total = db.query(func.coalesce(func.sum(PdfCacheEntry.size), 0)).scalar()
+    evicted = 0
+    while total > max_bytes:
+        entries = db.query(PdfCacheEntry).filter(PdfCacheEntry.digest != keep).order_by(
+            PdfCacheEntry.last_accessed_at
+        ).limit(PDF_CACHE_EVICT_BATCH).with_for_update(skip_locked=True).all()
+        removed = 0
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            try:
+                storage.delete(pdf_key(entry.digest))
+            except Exception:
+                logger.exception("Could not remove cached PDF %s", entry.digest)
+                continue
+            db.delete(entry)
+            total -= entry.size
+            removed += 1
+        db.commit()
+        evicted += removed
+        if not removed:
+            break
+    db.rollback()
+    return evicted
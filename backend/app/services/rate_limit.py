@@ -0,0 +1,51 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from typing import Hashable
+
+from ..database import engine
+from ..models import RateLimitBucket
+
+
+class RateLimiter:
+    """Token bucket limiter, one bucket per key, shared by all workers.
+
+    Buckets are rows of rate_limit_buckets updated with a single upsert, so the
+    limit holds across processes and nodes; the database clock is used, so
+    workers need not agree on the time.
+    """
+
+    def __init__(self, name: str, rate: int, per_seconds: float = 60.0):
+        self.name = name
+        self.capacity = float(rate)
+        self.refill_rate = rate / per_seconds
+
+    def _refilled(self):
+        elapsed = func.extract("epoch", func.now() - RateLimitBucket.updated_at)
+        return func.least(self.capacity, RateLimitBucket.tokens + elapsed * self.refill_rate)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token for key.
+
+        Returns 0 when the call is allowed, otherwise the number of seconds to
+        wait before a token becomes available.
+        """
+        bucket_key = f"{self.name}:{key}"
+        refilled = self._refilled()
+        statement = insert(RateLimitBucket).values(
+            key=bucket_key, tokens=self.capacity - 1, updated_at=func.now()
+        )
+        # Runs on its own connection so the caller's transaction is left alone
+        with engine.begin() as connection:
+            taken = connection.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[RateLimitBucket.key],
+                    set_={"tokens": refilled - 1, "updated_at": func.now()},
+                    where=refilled >= 1
+                ).returning(RateLimitBucket.key)
+            ).scalar()
+            if taken:
+                return 0.0
+            tokens = connection.execute(
+                select(refilled).where(RateLimitBucket.key == bucket_key)
+            ).scalar()
+        return max(0.0, (1 - (tokens or 0.0)) / self.refill_rate)
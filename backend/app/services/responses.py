@@ -0,0 +1,146 @@
+from sqlalchemy import update, case, cast, func, literal, select, Text
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from ..models import Form, FormResponse, UploadedFile
+from .form_fields import field_definitions
+from .indexed_fields import index_response, reindex_response
+from .changes import record_change, record_response_deletions
+
+
+def create_form_response(
+    db: Session,
+    form_id: int,
+    site_id: Optional[int],
+    form_version: Optional[int],
+    fields: Any,
+    user_id: Optional[int],
+    data: Dict[str, Any]
+) -> FormResponse:
+    """Add a form response and its derived rows to the session without committing.
+
+    Takes the form's id, version and fields rather than a Form so callers holding
+    a cached form version don't need to load the form row.
+    """
+    form_response = FormResponse(
+        form_id=form_id,
+        user_id=user_id,
+        form_version=form_version,
+        data=data
+    )
+    db.add(form_response)
+    db.flush()
+
+    index_response(db, form_id, fields, form_response)
+    record_change(db, "insert", form_response, site_id)
+    return form_response
+
+
+def _matching_responses(*criteria):
+    return select(FormResponse.id).join(Form, Form.id == FormResponse.form_id).where(*criteria)
+
+
+def delete_response_files(db: Session, *criteria) -> None:
+    """Delete the uploaded_files rows of the responses matching criteria, in the caller's transaction.
+
+    uploaded_files has no foreign key on the partitioned form_responses, so no
+    cascade reaches it; handlers deleting responses remove their files here.
+    The refcount triggers release the blobs.
+    """
+    db.query(UploadedFile).filter(
+        UploadedFile.form_response_id.in_(_matching_responses(*criteria))
+    ).delete(synchronize_session=False)
+
+
+def delete_responses(db: Session, *criteria) -> None:
+    """Delete the responses matching criteria in the caller's transaction.
+
+    Delete events and file rows go with them. Handlers call it before
+    deleting the form, site or user the responses belong to, so the change
+    feed never reports a deletion the table does not show.
+    """
+    record_response_deletions(db, *criteria)
+    delete_response_files(db, *criteria)
+    db.query(FormResponse).filter(
+        FormResponse.id.in_(_matching_responses(*criteria))
+    ).delete(synchronize_session="fetch")
+
+
+def validate_merge_patch(fields: Any, patch: Dict[str, Any]) -> List[str]:
+    """Check a merge patch against the form schema, returning error messages."""
+    definitions = {field["id"]: field for field in field_definitions(fields)}
+    errors = []
+    for field_id, value in patch.items():
+        field = definitions.get(field_id)
+        if field is None:
+            errors.append(f"Unknown field: {field_id}")
+        elif value is None and field.get("required"):
+            errors.append(f"Required field cannot be removed: {field_id}")
+    return errors
+
+
+def merge_patch_expression(target, patch: Dict[str, Any]):
+    """Build a SQL expression applying an RFC 7396 merge patch to a jsonb value.
+
+    Removals use `-`, nested objects are merged recursively with jsonb_set and
+    all other values are replaced in one `||`, so only the patched keys are
+    sent to the database.
+    """
+    expression = target
+    replacements = {}
+    for key, value in patch.items():
+        if value is None:
+            expression = expression.op("-", return_type=JSONB)(literal(key, Text))
+        elif isinstance(value, dict):
+            current = target.op("->", return_type=JSONB)(key)
+            existing = case(
+                (func.jsonb_typeof(current) == "object", current),
+                else_=cast("{}", JSONB)
+            )
+            expression = func.jsonb_set(
+                expression,
+                array([literal(key, Text)]),
+                merge_patch_expression(existing, value),
+                True,
+                type_=JSONB
+            )
+        else:
+            replacements[key] = value
+
+    if replacements:
+        expression = expression.op("||", return_type=JSONB)(literal(replacements, JSONB))
+    return expression
+
+
+def patch_form_response(
+    db: Session,
+    form_id: int,
+    site_id: Optional[int],
+    fields: Any,
+    response_id: int,
+    expected_revision: int,
+    patch: Dict[str, Any]
+) -> Optional[FormResponse]:
+    """Apply a merge patch in the database if the response is still at expected_revision.
+
+    Returns the updated response, or None when another write got there first.
+    Does not commit.
+    """
+    statement = update(FormResponse).where(
+        FormResponse.id == response_id,
+        FormResponse.form_id == form_id,
+        FormResponse.revision == expected_revision
+    ).values(
+        data=merge_patch_expression(FormResponse.data, patch),
+        revision=FormResponse.revision + 1,
+        updated_at=func.now()
+    ).returning(FormResponse).execution_options(synchronize_session=False)
+
+    form_response = db.execute(statement).scalars().first()
+    if form_response is None:
+        return None
+
+    reindex_response(db, form_id, fields, form_response, patch.keys())
+    record_change(db, "update", form_response, site_id)
+    return form_response
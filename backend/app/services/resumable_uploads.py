@@ -0,0 +1,194 @@
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, BinaryIO, Optional
+import fcntl
+import hashlib
+import os
+
+from ..models import UploadSession
+from .storage import storage
+from .uploads import UPLOAD_STAGING_DIR, UPLOAD_CHUNK_SIZE, StoredUpload, remove_files
+
+RESUMABLE_UPLOAD_MAX_SIZE = int(os.getenv("RESUMABLE_UPLOAD_MAX_SIZE", str(5 * 1024 ** 3)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+UPLOAD_SESSION_DIR = os.path.join(UPLOAD_STAGING_DIR, "sessions")
+# Session data stays on local disk whatever the storage backend. With remote
+# storage, set this once UPLOAD_DIR/incoming is shared by every API node or the
+# load balancer routes all requests of an upload to the same node
+UPLOAD_STAGING_SHARED = os.getenv("UPLOAD_STAGING_SHARED", "").lower() in ("1", "true", "yes")
+# With local storage UPLOAD_DIR, staging included, is shared by every node already
+RESUMABLE_UPLOADS_ENABLED = storage.local or UPLOAD_STAGING_SHARED
+
+
+class UploadOffsetMismatch(Exception):
+    """The chunk does not start where the session's data ends."""
+
+
+class UploadTooLarge(Exception):
+    """The chunk would write past the declared size."""
+
+
+class UploadBusy(Exception):
+    """Another request is writing to the session's file."""
+
+
+class UploadDataMissing(Exception):
+    """The session's file is missing or shorter than its offset.
+
+    The offset has been reset to `length`, the bytes actually there.
+    """
+
+    def __init__(self, length: int):
+        super().__init__(length)
+        self.length = length
+
+
+def session_path(upload_session: UploadSession) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, f"{upload_session.id}.part")
+
+
+def session_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+
+
+def _open_locked(path: str) -> BinaryIO:
+    """Open a session file for writing, holding an exclusive lock on it until closed."""
+    buffer = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+    try:
+        fcntl.flock(buffer, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        buffer.close()
+        raise UploadBusy()
+    return buffer
+
+
+def _file_length(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _save_offset(db: Session, session_id: str, expected: int, offset: int) -> bool:
+    """Move a session's offset from expected to offset; False if it was not at expected."""
+    moved = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.offset == expected)
+        .values(offset=offset, expires_at=session_expiry())
+    ).rowcount
+    db.commit()
+    return bool(moved)
+
+
+def _check_length(db: Session, session_id: str, offset: int, length: int) -> None:
+    # Zero-filling the gap would complete the upload with corrupt content
+    if length < offset:
+        _save_offset(db, session_id, offset, length)
+        raise UploadDataMissing(length)
+
+
+async def append_chunk(db: Session, upload_session: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """Append a streamed chunk to the session's file at offset.
+
+    Every chunk is appended to a single file, so finalizing needs no copy.
+    No transaction is held while the chunk streams: writers are serialized by
+    a lock on the file, and the offset only moves if it is still where the
+    chunk started. The new offset is saved even if the client disconnects
+    mid-chunk, so the bytes already received never have to be sent again.
+    """
+    if offset != upload_session.offset:
+        raise UploadOffsetMismatch()
+    session_id, size, path = upload_session.id, upload_session.size, session_path(upload_session)
+    db.commit()
+
+    os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+    buffer = await run_in_threadpool(_open_locked, path)
+    try:
+        # Checked under the file lock: a chunk that finished meanwhile has moved it
+        current = db.query(UploadSession.offset).filter(UploadSession.id == session_id).scalar()
+        db.commit()
+        if current != offset:
+            raise UploadOffsetMismatch()
+        _check_length(db, session_id, offset, os.fstat(buffer.fileno()).st_size)
+        # Drop anything past the acknowledged offset, e.g. a chunk cut short
+        # after the offset was last saved
+        await run_in_threadpool(buffer.truncate, offset)
+        await run_in_threadpool(buffer.seek, offset)
+
+        written = offset
+        try:
+            async for chunk in chunks:
+                if written + len(chunk) > size:
+                    raise UploadTooLarge()
+                await run_in_threadpool(buffer.write, chunk)
+                written += len(chunk)
+        finally:
+            await run_in_threadpool(buffer.flush)
+            saved = _save_offset(db, session_id, offset, written)
+        if not saved:
+            raise UploadOffsetMismatch()
+    finally:
+        await run_in_threadpool(buffer.close)
+    return written
+
+
+def _sha256(path: str) -> str:
+    checksum = hashlib.sha256()
+    with open(path, "rb") as buffer:
+        while True:
+            chunk = buffer.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+async def finalize_session(db: Session, upload_session: UploadSession) -> StoredUpload:
+    """Hash a complete session file and hand it over as a staged upload.
+
+    The file is read once for the checksum but never copied: the blob store
+    moves it into place with a rename. No transaction is held while hashing;
+    the caller locks the session again before storing the result.
+    """
+    session_id, size, path = upload_session.id, upload_session.size, session_path(upload_session)
+    db.commit()
+    _check_length(db, session_id, size, _file_length(path))
+    try:
+        checksum = await run_in_threadpool(_sha256, path)
+    except FileNotFoundError:
+        # Removed by another request meanwhile
+        _save_offset(db, session_id, size, 0)
+        raise UploadDataMissing(0)
+    return StoredUpload(os.path.basename(path), path, size, checksum)
+
+
+def discard_session(db: Session, upload_session: UploadSession) -> None:
+    remove_files([session_path(upload_session)])
+    db.delete(upload_session)
+
+
+def expire_sessions(db: Session, dry_run: bool = False) -> int:
+    """Delete abandoned upload sessions and their partial files."""
+    query = db.query(UploadSession).filter(UploadSession.expires_at < func.now())
+    if dry_run:
+        return query.count()
+
+    expired = 0
+    for upload_session in query.with_for_update(skip_locked=True).all():
+        discard_session(db, upload_session)
+        expired += 1
+    db.commit()
+    return expired
+
+
+def get_session(db: Session, session_id: str, user_id: int, for_update: bool = False) -> Optional[UploadSession]:
+    query = db.query(UploadSession).filter(
+        UploadSession.id == session_id,
+        UploadSession.user_id == user_id
+    )
+    if for_update:
+        # Held while a session is completed or aborted, never while data streams
+        query = query.with_for_update(nowait=True)
+    return query.first()
@@ -0,0 +1,77 @@
+from sqlalchemy import cast, func, and_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+import html
+import os
+
+from ..models import FormResponse
+
+# Must match the text search configuration the search_vector column was generated with
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "simple")
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# Control characters mark the hits, so the submitted text can be escaped before the tags go in
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+HEADLINE_OPTIONS = f'StartSel="{HEADLINE_START}", StopSel="{HEADLINE_STOP}", MaxWords=20, MinWords=5'
+
+
+def _highlight(headline: str) -> str:
+    """HTML of a headline: the text escaped, hits wrapped in HIGHLIGHT_START/HIGHLIGHT_STOP."""
+    return html.escape(headline).replace(HEADLINE_START, HIGHLIGHT_START).replace(HEADLINE_STOP, HIGHLIGHT_STOP)
+
+
+def search_form_responses(db: Session, form_id: int, q: str, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+    """Return ranked responses of a form matching a web-style search query.
+
+    Ranking and pagination run against the GIN index first; highlighting is only
+    computed for the rows of the requested page.
+    """
+    language = cast(SEARCH_LANGUAGE, REGCONFIG)
+    ts_query = func.websearch_to_tsquery(language, q)
+    rank = func.ts_rank_cd(FormResponse.search_vector, ts_query)
+
+    page = db.query(
+        FormResponse.id.label("id"),
+        FormResponse.created_at.label("created_at"),
+        rank.label("rank")
+    ).filter(
+        FormResponse.form_id == form_id,
+        FormResponse.search_vector.op("@@")(ts_query)
+    ).order_by(
+        rank.desc(),
+        FormResponse.id.desc()
+    ).offset(skip).limit(limit).subquery()
+
+    rows = db.query(
+        FormResponse.id,
+        FormResponse.user_id,
+        FormResponse.created_at,
+        page.c.rank,
+        func.ts_headline(language, FormResponse.data, ts_query, HEADLINE_OPTIONS).label("headline")
+    ).join(
+        page,
+        and_(FormResponse.id == page.c.id, FormResponse.created_at == page.c.created_at)
+    ).filter(
+        FormResponse.form_id == form_id
+    ).order_by(
+        page.c.rank.desc(),
+        FormResponse.id.desc()
+    ).all()
+
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "created_at": row.created_at,
+            "rank": row.rank,
+            "highlights": {
+                field_id: _highlight(value)
+                for field_id, value in (row.headline or {}).items()
+                if isinstance(value, str) and HEADLINE_START in value
+            }
+        }
+        for row in rows
+    ]
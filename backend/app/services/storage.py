@@ -0,0 +1,216 @@
+from abc import ABC, abstractmethod
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from urllib.parse import quote
+import os
+
+from .uploads import UPLOAD_DIR, UPLOAD_CHUNK_SIZE
+
+# "local" keeps files under UPLOAD_DIR; "s3" stores them in an S3-compatible bucket
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+# Set for S3-compatible servers (MinIO, a local stand-in, ...); empty for AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_REGION = os.getenv("S3_REGION", "")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+STORAGE_PRESIGNED_URL_TTL = int(os.getenv("STORAGE_PRESIGNED_URL_TTL", "300"))  # seconds
+# Archive tier for blobs nobody reads anymore, typically a cheaper volume
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "./cold-storage")
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # POSIX timestamp
+
+
+class Storage(ABC):
+    """Where stored files live, addressed by keys such as blobs/ab/cd/<sha256>.
+
+    Files are always produced on local disk first (staging) and handed over
+    with put(), which consumes the local file.
+    """
+
+    # Whether keys map to paths on this node's disk
+    local = False
+
+    @abstractmethod
+    def put(self, key: str, source_path: str) -> None:
+        """Store a local file under key, consuming it."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Readable, seekable binary file; raises FileNotFoundError if the key is missing."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key; missing keys are ignored."""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[StoredObject]:
+        """Size and modification time of a key, None if it is missing."""
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        """Yield the objects whose key starts with prefix, without building the full listing."""
+
+    def path(self, key: str) -> Optional[str]:
+        """Path of the key on local disk, None for remote storage."""
+        return None
+
+    def presigned_url(self, key: str, filename: str, media_type: str, expires: int = STORAGE_PRESIGNED_URL_TTL) -> Optional[str]:
+        """Temporary URL to download the key directly, None if the storage has none."""
+        return None
+
+
+class LocalStorage(Storage):
+    """Files under a directory of this node (or a shared mount)."""
+
+    local = True
+
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, source_path: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(key, stat.st_size, stat.st_mtime)
+
+    def _walk(self, directory: str, prefix: str) -> Iterator[StoredObject]:
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                key = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+                if entry.is_dir(follow_symlinks=False):
+                    if (key + "/").startswith(prefix) or prefix.startswith(key + "/"):
+                        yield from self._walk(entry.path, prefix)
+                elif entry.is_file(follow_symlinks=False) and key.startswith(prefix):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield StoredObject(key, stat.st_size, stat.st_mtime)
+
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        # Start from the deepest directory the prefix names
+        directory = self.path(prefix.rsplit("/", 1)[0]) if "/" in prefix else self.root
+        return self._walk(directory, prefix)
+
+
+class S3Storage(Storage):
+    """Objects in a bucket of S3 or an S3-compatible server."""
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefix: str = S3_PREFIX,
+        endpoint_url: str = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+        access_key_id: str = S3_ACCESS_KEY_ID,
+        secret_access_key: str = S3_SECRET_ACCESS_KEY
+    ):
+        # Only needed with this backend
+        import boto3
+        from botocore.exceptions import ClientError
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET is required with STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None
+        )
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _is_missing(self, error: Exception) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def put(self, key: str, source_path: str) -> None:
+        # Sent as a multipart upload when large
+        self.client.upload_file(source_path, self.bucket, self._key(key))
+        os.remove(source_path)
+
+    def open(self, key: str) -> BinaryIO:
+        buffer = SpooledTemporaryFile(max_size=8 * UPLOAD_CHUNK_SIZE)
+        try:
+            self.client.download_fileobj(self.bucket, self._key(key), buffer)
+        except self._client_error as error:
+            buffer.close()
+            if self._is_missing(error):
+                raise FileNotFoundError(key)
+            raise
+        buffer.seek(0)
+        return buffer
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as error:
+            if self._is_missing(error):
+                return None
+            raise
+        return StoredObject(key, head["ContentLength"], head["LastModified"].timestamp())
+
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"][len(self.prefix):], item["Size"], item["LastModified"].timestamp())
+
+    def presigned_url(self, key: str, filename: str, media_type: str, expires: int = STORAGE_PRESIGNED_URL_TTL) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}",
+                "ResponseContentType": media_type
+            },
+            ExpiresIn=expires
+        )
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "local":
+        return LocalStorage()
+    if backend == "s3":
+        return S3Storage()
+    raise RuntimeError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_storage()
+cold_storage = LocalStorage(COLD_STORAGE_DIR)
@@ -0,0 +1,286 @@
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Set
+import asyncio
+import logging
+import os
+import time
+
+from ..database import SessionLocal, engine
+from ..models import FileBlob, Form, MessageAttachment, PdfCacheEntry, UploadedFile, UploadSession
+from .blobs import TIER_COLD, TIER_HOT, blob_key, cold_key, delete_unreferenced_blobs
+from .form_snapshots import FORM_SNAPSHOT_DIR
+from .resumable_uploads import UPLOAD_SESSION_DIR
+from .storage import LocalStorage, Storage, StoredObject, cold_storage, storage
+from .uploads import UPLOAD_DIR, UPLOAD_STAGING_DIR
+
+STORAGE_GC_GRACE_HOURS = int(os.getenv("STORAGE_GC_GRACE_HOURS", "24"))
+STORAGE_GC_INTERVAL = int(os.getenv("STORAGE_GC_INTERVAL", "3600"))  # seconds, 0 disables the background run
+STORAGE_GC_BATCH_SIZE = int(os.getenv("STORAGE_GC_BATCH_SIZE", "1000"))
+
+# Key prefixes of each kind of stored file
+BLOB_PREFIX = "blobs/"
+PDF_PREFIX = "pdfs/"
+STAGING_PREFIX = os.path.relpath(UPLOAD_STAGING_DIR, UPLOAD_DIR) + "/"
+SESSION_PREFIX = os.path.relpath(UPLOAD_SESSION_DIR, UPLOAD_DIR) + "/"
+
+# Only one worker reconciles at a time
+STORAGE_GC_LOCK_ID = 7_401_001
+
+logger = logging.getLogger(__name__)
+
+
+def _batches(objects: Iterator[StoredObject], size: int) -> Iterator[List[StoredObject]]:
+    batch = []
+    for stored in objects:
+        batch.append(stored)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _referenced_paths(db: Session, paths: List[str]) -> Set[str]:
+    """Normalized paths among `paths` still referenced by a file row (legacy layout)."""
+    candidates = set(paths) | {os.path.normpath(path) for path in paths}
+    referenced = set()
+    for model in (UploadedFile, MessageAttachment):
+        rows = db.execute(select(model.file_path).where(model.file_path.in_(candidates))).scalars()
+        referenced.update(os.path.normpath(path) for path in rows)
+    return referenced
+
+
+def _known(db: Session, column, values: Set[str]) -> Set[str]:
+    if not values:
+        return set()
+    return set(db.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _name_key(key: str) -> str:
+    # <sha256>, <sha256>.<variant>.webp or a leftover .part
+    return key.rsplit("/", 1)[-1].split(".", 1)[0]
+
+
+def _area(key: str) -> str:
+    for prefix, area in ((SESSION_PREFIX, "sessions"), (STAGING_PREFIX, "staging"), (BLOB_PREFIX, "blobs"), (PDF_PREFIX, "pdfs")):
+        if key.startswith(prefix):
+            return area
+    return "legacy"
+
+
+def _stale_copies(db: Session, keys: List[str], tier: str, cutoff: float) -> Set[str]:
+    """Keys among blob copies on `tier` left behind by a move to the other tier.
+
+    A copy is stale once its blob has been on the other tier (or stored
+    under another compression) for the grace period. The blob rows are
+    locked until the caller's rollback, so a tier move cannot bring a copy
+    back into use while it is deleted; blobs being moved are skipped.
+    """
+    if not keys:
+        return set()
+    blobs = {
+        blob.sha256: blob for blob in db.query(FileBlob).filter(
+            FileBlob.sha256.in_({_name_key(key) for key in keys}),
+            FileBlob.tiered_at < datetime.fromtimestamp(cutoff, timezone.utc)
+        ).with_for_update(skip_locked=True)
+    }
+    stale = set()
+    for key in keys:
+        blob = blobs.get(_name_key(key))
+        if blob is None:
+            continue
+        current = blob_key(blob.sha256) if blob.tier == TIER_HOT else cold_key(blob)
+        if blob.tier != tier or key != current:
+            stale.add(key)
+    return stale
+
+
+def _orphans(db: Session, batch: List[StoredObject], cutoff: float, tier: str = TIER_HOT) -> List[StoredObject]:
+    """Objects of a batch that no row accounts for and are older than the grace period."""
+    old = [stored for stored in batch if stored.modified < cutoff]
+    if not old:
+        return []
+
+    areas = {stored.key: _area(stored.key) for stored in old}
+    known_blobs = _known(db, FileBlob.sha256, {_name_key(key) for key, area in areas.items() if area == "blobs"})
+    # Image variants only ever live on the hot tier
+    stale_copies = _stale_copies(db, [
+        key for key, area in areas.items()
+        if area == "blobs" and not key.endswith(".webp") and _name_key(key) in known_blobs
+    ], tier, cutoff)
+    known_sessions = _known(db, UploadSession.id, {_name_key(key) for key, area in areas.items() if area == "sessions"})
+    known_pdfs = _known(db, PdfCacheEntry.digest, {_name_key(key) for key, area in areas.items() if area == "pdfs"})
+    legacy = [os.path.join(UPLOAD_DIR, key) for key, area in areas.items() if area == "legacy"]
+    referenced = _referenced_paths(db, legacy) if legacy else set()
+
+    orphans = []
+    for stored in old:
+        area = areas[stored.key]
+        if area == "blobs":
+            # Blobs of live rows, and partial writes still moving in, are kept
+            orphan = _name_key(stored.key) not in known_blobs or stored.key in stale_copies
+        elif area == "sessions":
+            orphan = _name_key(stored.key) not in known_sessions
+        elif area == "staging":
+            # Staged uploads are moved into the blob store within the request
+            orphan = True
+        elif area == "pdfs":
+            # Cached PDFs are evicted by the cache itself
+            orphan = _name_key(stored.key) not in known_pdfs
+        else:
+            orphan = os.path.normpath(os.path.join(UPLOAD_DIR, stored.key)) not in referenced
+        if orphan:
+            orphans.append(stored)
+    return orphans
+
+
+def _remove_orphans(
+    db: Session,
+    source: Storage,
+    tier: str,
+    cutoff: float,
+    dry_run: bool,
+    batch_size: int,
+    report: Dict[str, int]
+) -> None:
+    for batch in _batches(source.list(), batch_size):
+        for stored in _orphans(db, batch, cutoff, tier):
+            if dry_run:
+                logger.info("Would remove %s", stored.key)
+            else:
+                source.delete(stored.key)
+            report["files"] += 1
+            report["bytes"] += stored.size
+        # Keep no snapshot or locks open across the walk
+        db.rollback()
+
+
+def _remove_snapshots(db: Session, cutoff: float, dry_run: bool, batch_size: int, report: Dict[str, int]) -> None:
+    """Remove form snapshots older than the grace period that no form points to."""
+    snapshots = LocalStorage(FORM_SNAPSHOT_DIR)
+    for batch in _batches(snapshots.list(), batch_size):
+        old = [stored for stored in batch if stored.modified < cutoff]
+        current = _known(db, Form.snapshot_hash, {_name_key(stored.key) for stored in old})
+        db.rollback()
+        for stored in old:
+            if _name_key(stored.key) in current:
+                continue
+            # Reused since listed: write_form_snapshot touches the file first
+            latest = snapshots.stat(stored.key)
+            if latest is None or latest.modified >= cutoff:
+                continue
+            if dry_run:
+                logger.info("Would remove snapshot %s", stored.key)
+            else:
+                snapshots.delete(stored.key)
+            report["files"] += 1
+            report["bytes"] += stored.size
+
+
+def reconcile_storage(
+    db: Session,
+    grace_hours: int = STORAGE_GC_GRACE_HOURS,
+    dry_run: bool = False,
+    batch_size: int = STORAGE_GC_BATCH_SIZE
+) -> Dict[str, int]:
+    """Reclaim storage that no database row accounts for anymore.
+
+    1. blobs unreferenced for longer than the grace period are deleted;
+    2. the storage (and UPLOAD_DIR, with remote storage) is listed in batches
+       and files older than the grace period
+       that no row references (legacy files, stray blobs and variants,
+       abandoned staging and session files, PDFs left out of the cache) are deleted,
+       as are copies left on the hot or cold tier by a tier move;
+    3. form snapshots no form points to anymore (superseded by an update, or
+       of deleted forms) are deleted once older than the grace period.
+
+    Request handlers only delete rows; everything on disk is reclaimed here.
+    """
+    report = {"blobs": 0, "files": 0, "bytes": 0}
+    released_before = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    cutoff = time.time() - grace_hours * 3600
+
+    if dry_run:
+        report["blobs"] = db.query(func.count(FileBlob.sha256)).filter(
+            FileBlob.ref_count <= 0,
+            FileBlob.released_at < released_before
+        ).scalar()
+    else:
+        while True:
+            deleted = delete_unreferenced_blobs(db, released_before=released_before, limit=batch_size)
+            db.commit()
+            report["blobs"] += len(deleted)
+            if len(deleted) < batch_size:
+                break
+
+    sources = [(storage, TIER_HOT), (cold_storage, TIER_COLD)]
+    if not storage.local:
+        # Staging and legacy files stay on local disk whatever the storage backend
+        sources.append((LocalStorage(UPLOAD_DIR), TIER_HOT))
+    for source, tier in sources:
+        _remove_orphans(db, source, tier, cutoff, dry_run, batch_size, report)
+    _remove_snapshots(db, cutoff, dry_run, batch_size, report)
+    return report
+
+
+def reconcile_node(
+    db: Session,
+    grace_hours: int = STORAGE_GC_GRACE_HOURS,
+    dry_run: bool = False,
+    batch_size: int = STORAGE_GC_BATCH_SIZE
+) -> Dict[str, int]:
+    """Reclaim orphan files under this node's UPLOAD_DIR (staging, sessions, legacy files)
+    and its stale form snapshots.
+
+    With remote storage UPLOAD_DIR is not shared, so every node cleans its
+    own; reconcile_storage only reaches the disk of the node running it.
+    """
+    report = {"blobs": 0, "files": 0, "bytes": 0}
+    cutoff = time.time() - grace_hours * 3600
+    _remove_orphans(db, LocalStorage(UPLOAD_DIR), TIER_HOT, cutoff, dry_run, batch_size, report)
+    _remove_snapshots(db, cutoff, dry_run, batch_size, report)
+    return report
+
+
+def run_locked(dry_run: bool = False) -> Dict[str, int]:
+    """Reconcile unless another worker already is; returns an empty report then.
+
+    With remote storage, workers that do not get the lock still clean their
+    node's UPLOAD_DIR.
+    """
+    # The advisory lock lives on its own connection: the session below commits
+    # in batches and hands its connection back to the pool each time
+    with engine.connect() as lock_connection:
+        locked = lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:id)"), {"id": STORAGE_GC_LOCK_ID}
+        ).scalar()
+        if not locked:
+            if storage.local:
+                return {}
+            db = SessionLocal()
+            try:
+                return reconcile_node(db, dry_run=dry_run)
+            finally:
+                db.close()
+        db = SessionLocal()
+        try:
+            return reconcile_storage(db, dry_run=dry_run)
+        finally:
+            db.close()
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": STORAGE_GC_LOCK_ID})
+            lock_connection.commit()
+
+
+async def run_periodically(interval: int = STORAGE_GC_INTERVAL) -> None:
+    """Reconcile storage every interval seconds until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await loop.run_in_executor(None, run_locked)
+            if report:
+                logger.info("Storage reconciled: %s", report)
+        except Exception:
+            logger.exception("Storage reconciliation failed")
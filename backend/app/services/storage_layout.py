@@ -0,0 +1,108 @@
+from sqlalchemy.orm import Session
+from typing import Dict
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+
+from ..models import MessageAttachment, UploadedFile
+from .blobs import blob_columns, store_blob, stored_path
+from .uploads import UPLOAD_CHUNK_SIZE, UPLOAD_STAGING_DIR, StoredUpload, remove_files
+
+STORAGE_MIGRATE_BATCH_SIZE = int(os.getenv("STORAGE_MIGRATE_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+def _stage(source: str) -> StoredUpload:
+    """Hash a legacy file and give it a second name in the staging directory.
+
+    The original stays in place until the rows pointing at it are committed,
+    so a failed batch leaves every row readable.
+    """
+    checksum = hashlib.sha256()
+    size = 0
+    with open(source, "rb") as buffer:
+        while True:
+            chunk = buffer.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            checksum.update(chunk)
+
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    filename = f"{uuid.uuid4().hex}_{os.path.basename(source)}"
+    file_path = os.path.join(UPLOAD_STAGING_DIR, filename)
+    try:
+        os.link(source, file_path)
+    except OSError:
+        # Another filesystem, or no hard links
+        shutil.copyfile(source, file_path)
+    return StoredUpload(filename, file_path, size, checksum.hexdigest())
+
+
+def migrate_legacy_files(
+    db: Session,
+    batch_size: int = STORAGE_MIGRATE_BATCH_SIZE,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """Move files of the flat legacy layout into the sharded blob store.
+
+    Rows without a blob are taken in batches of batch_size and locked; each
+    file is hashed, stored as a blob and every row pointing at it re-pointed
+    (the refcount triggers account for them). Legacy files are only removed
+    once their batch is committed. Files that are gone are reported and left
+    to the storage reconciler.
+    """
+    report = {"files": 0, "rows": 0, "missing": 0, "bytes": 0}
+    for model in (UploadedFile, MessageAttachment):
+        last_id = 0
+        while True:
+            rows = db.query(model).filter(
+                model.blob_sha256.is_(None),
+                model.id > last_id
+            ).order_by(model.id).limit(batch_size).with_for_update().all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            migrated = {}
+            try:
+                for row in rows:
+                    if row.file_path in migrated:
+                        # Already re-pointed along with the first row sharing the file
+                        report["rows"] += dry_run
+                        continue
+                    source = stored_path(row)
+                    if not os.path.isfile(source):
+                        logger.warning("Missing file for %s %s: %s", model.__tablename__, row.id, source)
+                        report["missing"] += 1
+                        continue
+                    if dry_run:
+                        migrated[row.file_path] = source
+                        report["files"] += 1
+                        report["rows"] += 1
+                        report["bytes"] += os.path.getsize(source)
+                        continue
+
+                    staged = _stage(source)
+                    columns = blob_columns(store_blob(db, staged))
+                    for referencing in (UploadedFile, MessageAttachment):
+                        report["rows"] += db.query(referencing).filter(
+                            referencing.file_path == row.file_path,
+                            referencing.blob_sha256.is_(None)
+                        ).update(columns, synchronize_session=False)
+                    migrated[row.file_path] = source
+                    report["files"] += 1
+                    report["bytes"] += staged.size
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            if not dry_run:
+                remove_files(list(migrated.values()))
+    return report
@@ -0,0 +1,85 @@
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+import os
+
+from ..models import Form, FormResponse, Message, StorageUsage, User
+
+# Bytes a user or a site may store, 0 for no limit; overridden per owner by storage_usage.quota_bytes
+STORAGE_USER_QUOTA = int(os.getenv("STORAGE_USER_QUOTA", "0"))
+STORAGE_SITE_QUOTA = int(os.getenv("STORAGE_SITE_QUOTA", "0"))
+
+SCOPE_USER = "user"
+SCOPE_SITE = "site"
+DEFAULT_QUOTAS = {SCOPE_USER: STORAGE_USER_QUOTA, SCOPE_SITE: STORAGE_SITE_QUOTA}
+
+
+def file_owner(
+    db: Session,
+    response_id: Optional[int] = None,
+    message_id: Optional[int] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """(user_id, site_id) a file of a form response or a message counts against.
+
+    Response files count for the response's user and the form's site; message
+    attachments for the sender and the sender's site.
+    """
+    if response_id is not None:
+        owner = db.query(FormResponse.user_id, Form.site_id).join(
+            Form, Form.id == FormResponse.form_id
+        ).filter(FormResponse.id == response_id).first()
+    else:
+        owner = db.query(Message.sender_id, User.site_id).join(
+            User, User.id == Message.sender_id
+        ).filter(Message.id == message_id).first()
+    return tuple(owner) if owner else (None, None)
+
+
+def quota_of(scope: str, usage: Optional[StorageUsage]) -> Optional[int]:
+    """Quota in bytes of an owner, None when unlimited."""
+    quota = usage.quota_bytes if usage is not None and usage.quota_bytes is not None else DEFAULT_QUOTAS[scope]
+    return quota or None
+
+
+def get_usage(db: Session, scope: str, owner_id: int) -> dict:
+    usage = db.get(StorageUsage, (scope, owner_id), populate_existing=True)
+    return {
+        "scope": scope,
+        "owner_id": owner_id,
+        "bytes": usage.bytes if usage else 0,
+        "files": usage.files if usage else 0,
+        "quota_bytes": quota_of(scope, usage)
+    }
+
+
+def set_quota(db: Session, scope: str, owner_id: int, quota_bytes: Optional[int]) -> None:
+    """Set the quota of an owner; None falls back to the default of the scope."""
+    usage = db.get(StorageUsage, (scope, owner_id))
+    if usage is None:
+        usage = StorageUsage(scope=scope, owner_id=owner_id, bytes=0, files=0)
+        db.add(usage)
+    usage.quota_bytes = quota_bytes
+
+
+def check_quota(db: Session, user_id: Optional[int], site_id: Optional[int], incoming: int = 0) -> None:
+    """Raise 413 if the user or the site would go over quota with `incoming` more bytes.
+
+    Called with the announced size before any byte is written, then again with
+    no incoming bytes once the file rows are flushed: the usage triggers have
+    counted them by then and keep the counters locked until commit, so
+    concurrent uploads of the same owner cannot both slip under the limit.
+    """
+    owners = [(scope, owner_id) for scope, owner_id in ((SCOPE_USER, user_id), (SCOPE_SITE, site_id)) if owner_id is not None]
+    for scope, owner_id in owners:
+        usage = db.execute(
+            select(StorageUsage).where(StorageUsage.scope == scope, StorageUsage.owner_id == owner_id)
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        quota = quota_of(scope, usage)
+        used = usage.bytes if usage is not None else 0
+        if quota is not None and used + incoming > quota:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Storage quota of the {scope} exceeded ({used} of {quota} bytes used)"
+            )
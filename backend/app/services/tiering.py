@@ -0,0 +1,176 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+import gzip
+import logging
+import os
+import shutil
+import uuid
+
+from ..models import FileBlob
+from .blobs import TIER_COLD, TIER_HOT, blob_key, cold_key
+from .storage import cold_storage, storage
+from .uploads import UPLOAD_CHUNK_SIZE, UPLOAD_STAGING_DIR, remove_files
+
+COLD_STORAGE_AFTER_DAYS = int(os.getenv("COLD_STORAGE_AFTER_DAYS", "90"))
+COLD_STORAGE_COMPRESSION_LEVEL = int(os.getenv("COLD_STORAGE_COMPRESSION_LEVEL", "6"))
+# Files gzip cannot shrink by this fraction (images, PDFs, archives) are archived as they are
+COLD_STORAGE_MIN_SAVING = float(os.getenv("COLD_STORAGE_MIN_SAVING", "0.1"))
+BLOB_ACCESS_UPDATE_HOURS = int(os.getenv("BLOB_ACCESS_UPDATE_HOURS", "24"))
+TIERING_BATCH_SIZE = int(os.getenv("TIERING_BATCH_SIZE", "100"))
+
+logger = logging.getLogger(__name__)
+
+
+def touch_blob(db: Session, sha256: str) -> None:
+    """Record a download of a blob.
+
+    Written at most every BLOB_ACCESS_UPDATE_HOURS per blob, so frequently
+    read files cost a write a day rather than one per download.
+    """
+    now = datetime.now(timezone.utc)
+    db.execute(
+        update(FileBlob)
+        .where(
+            FileBlob.sha256 == sha256,
+            FileBlob.last_accessed_at < now - timedelta(hours=BLOB_ACCESS_UPDATE_HOURS)
+        )
+        .values(last_accessed_at=now)
+    )
+    db.commit()
+
+
+def _staging_path() -> str:
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    return os.path.join(UPLOAD_STAGING_DIR, uuid.uuid4().hex)
+
+
+def _archive(blob: FileBlob) -> str:
+    """Write the cold copy of a blob to staging; sets its compression and returns the path."""
+    tmp_path = _staging_path()
+    with storage.open(blob_key(blob.sha256)) as source:
+        with open(tmp_path, "wb") as raw, gzip.GzipFile(
+            fileobj=raw, mode="wb", compresslevel=COLD_STORAGE_COMPRESSION_LEVEL, mtime=0
+        ) as compressed:
+            shutil.copyfileobj(source, compressed, UPLOAD_CHUNK_SIZE)
+
+        if os.path.getsize(tmp_path) <= blob.size * (1 - COLD_STORAGE_MIN_SAVING):
+            blob.compression = "gzip"
+        else:
+            # Not worth decompressing on every read
+            source.seek(0)
+            with open(tmp_path, "wb") as raw:
+                shutil.copyfileobj(source, raw, UPLOAD_CHUNK_SIZE)
+            blob.compression = None
+    return tmp_path
+
+
+def demote_blob(db: Session, blob: FileBlob) -> int:
+    """Move a locked hot blob to the cold tier; returns the bytes moved.
+
+    The hot copy is left in place: downloads that read the row before the
+    move may still be streaming it. The storage reconciler removes it once
+    the blob has been cold for the grace period.
+    """
+    size = blob.size
+    tmp_path = _archive(blob)
+    try:
+        blob.stored_size = os.path.getsize(tmp_path)
+        cold_storage.put(cold_key(blob), tmp_path)
+    except BaseException:
+        remove_files([tmp_path])
+        raise
+    blob.tier = TIER_COLD
+    blob.tiered_at = datetime.now(timezone.utc)
+    db.commit()
+    return size
+
+
+def promote_blob(db: Session, blob: FileBlob) -> int:
+    """Bring a locked cold blob back to the hot tier; returns the bytes restored.
+
+    Like the hot copy on demotion, the cold copy is left for the storage
+    reconciler.
+    """
+    key = cold_key(blob)
+    size = blob.size
+    tmp_path = _staging_path()
+    try:
+        with cold_storage.open(key) as source:
+            reader = gzip.GzipFile(fileobj=source, mode="rb") if blob.compression == "gzip" else source
+            with open(tmp_path, "wb") as target:
+                shutil.copyfileobj(reader, target, UPLOAD_CHUNK_SIZE)
+        storage.put(blob_key(blob.sha256), tmp_path)
+    except BaseException:
+        remove_files([tmp_path])
+        raise
+    blob.tier = TIER_HOT
+    blob.compression = None
+    blob.stored_size = None
+    blob.tiered_at = datetime.now(timezone.utc)
+    db.commit()
+    return size
+
+
+def _candidates(db: Session, *criteria) -> Iterator[List[str]]:
+    """Hashes of matching blobs in batches; each batch is read once, so failures are not retried in a loop."""
+    last = ""
+    while True:
+        batch = [
+            sha256 for (sha256,) in db.query(FileBlob.sha256).filter(
+                *criteria, FileBlob.sha256 > last
+            ).order_by(FileBlob.sha256).limit(TIERING_BATCH_SIZE).all()
+        ]
+        db.rollback()
+        if not batch:
+            return
+        last = batch[-1]
+        yield batch
+
+
+def tier_blobs(db: Session, cold_after_days: int = COLD_STORAGE_AFTER_DAYS, dry_run: bool = False) -> Dict[str, int]:
+    """Move blobs between tiers by last access.
+
+    Referenced blobs not downloaded for cold_after_days go to the cold tier,
+    compressed when worthwhile; cold blobs downloaded since they were moved
+    come back. Each blob is moved in its own transaction, locked so uploads
+    and cleanup of the same content wait; blobs already locked are skipped.
+    """
+    report = {"demoted": 0, "promoted": 0, "bytes_demoted": 0, "bytes_promoted": 0}
+    cutoff = datetime.now(timezone.utc) - timedelta(days=cold_after_days)
+    moves = (
+        (TIER_HOT, demote_blob, "demoted", (
+            FileBlob.tier == TIER_HOT,
+            FileBlob.ref_count > 0,
+            FileBlob.last_accessed_at < cutoff
+        )),
+        (TIER_COLD, promote_blob, "promoted", (
+            FileBlob.tier == TIER_COLD,
+            FileBlob.last_accessed_at > FileBlob.tiered_at
+        )),
+    )
+
+    for tier, move, counter, criteria in moves:
+        for batch in _candidates(db, *criteria):
+            for sha256 in batch:
+                blob = db.query(FileBlob).filter(
+                    FileBlob.sha256 == sha256,
+                    *criteria
+                ).with_for_update(skip_locked=True).first()
+                if blob is None:
+                    db.rollback()
+                    continue
+                if dry_run:
+                    moved = blob.size
+                    db.rollback()
+                else:
+                    try:
+                        moved = move(db, blob)
+                    except Exception:
+                        db.rollback()
+                        logger.exception("Could not move blob %s off the %s tier", sha256, tier)
+                        continue
+                report[counter] += 1
+                report[f"bytes_{counter}"] += moved
+    return report
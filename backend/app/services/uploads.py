@@ -0,0 +1,186 @@
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from typing import List, NamedTuple
+import asyncio
+import hashlib
+import os
+import uuid
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+# Uploads are written here, then moved into the blob store once hashed
+UPLOAD_STAGING_DIR = os.path.join(UPLOAD_DIR, "incoming")
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "5242880"))
+ALLOWED_EXTENSIONS = {
+    extension.strip().lower()
+    for extension in os.getenv("ALLOWED_EXTENSIONS", ".pdf,.doc,.docx,.txt,.jpg,.jpeg,.png").split(",")
+    if extension.strip()
+}
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", "10"))
+# Room for the form fields and part headers around the files of a multipart request
+MULTIPART_OVERHEAD = 1048576
+MAX_MULTIPART_REQUEST_SIZE = MAX_UPLOAD_SIZE * MAX_UPLOAD_FILES + MULTIPART_OVERHEAD
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    file_path: str
+    size: int
+    checksum: str  # sha256, hex
+
+
+def check_extension(original_filename: str) -> None:
+    extension = os.path.splitext(original_filename)[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"File type not allowed: {extension or original_filename}"
+        )
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the maximum upload size of {MAX_UPLOAD_SIZE} bytes"
+    )
+
+
+class RequestTooLarge(HTTPException):
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request body exceeds {max_size} bytes"
+        )
+
+
+class UploadLimitMiddleware:
+    """Cut off multipart requests larger than max_size while they arrive.
+
+    The multipart parser spools the whole body before the endpoint runs, so
+    per-file checks alone would only fire once everything was received. A
+    larger Content-Length is refused before reading anything; otherwise the
+    body is counted as it streams in and the request fails with 413 as soon
+    as it goes over.
+    """
+
+    def __init__(self, app, max_size: int = MAX_MULTIPART_REQUEST_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise RequestTooLarge(self.max_size)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            # Normally answered by the app's exception handler; this covers reads outside it
+            if started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send) -> None:
+        error = RequestTooLarge(self.max_size)
+        await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+
+
+async def save_upload(file: UploadFile, directory: str = UPLOAD_STAGING_DIR) -> StoredUpload:
+    """Copy an uploaded file to directory in fixed-size chunks.
+
+    Memory use is one chunk whatever the file size. The request as a whole is
+    capped while it arrives by UploadLimitMiddleware; the per-file limit is
+    checked here as chunks are copied and the checksum computed along the
+    way. The file only appears under its final name once fully written.
+    """
+    original_filename = os.path.basename(file.filename or "upload")
+    check_extension(original_filename)
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise _too_large()
+
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{uuid.uuid4().hex}_{original_filename}"
+    file_path = os.path.join(directory, filename)
+    tmp_path = f"{file_path}.part"
+
+    checksum = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    buffer = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise _too_large()
+            checksum.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, tmp_path, file_path)
+    except BaseException:
+        buffer.close()
+        remove_files([tmp_path])
+        raise
+
+    return StoredUpload(filename, file_path, size, checksum.hexdigest())
+
+
+async def save_uploads(files: List[UploadFile], directory: str = UPLOAD_STAGING_DIR) -> List[StoredUpload]:
+    """Write several uploaded files concurrently.
+
+    Either every file is written or none is: on failure the files already
+    written are removed before the error is raised.
+    """
+    if len(files) > MAX_UPLOAD_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_UPLOAD_FILES} files can be sent at once"
+        )
+    results = await asyncio.gather(
+        *(save_upload(file, directory) for file in files),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        remove_files([result.file_path for result in results if not isinstance(result, BaseException)])
+        raise errors[0]
+    return results
+
+
+def remove_files(file_paths: List[str]) -> None:
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
@@ -153,9 +153,8 @@ export const api = {
       return response.data;
     },
     downloadFile: async (fileId: number): Promise<Blob> => {
-      const { data } = await axios.get<Blob>(`${axiosInstance.defaults.baseURL}/admin/files/${fileId}/download`, {
+      const { data } = await axiosInstance.get<Blob>(`/api/files/${fileId}/download`, {
         responseType: 'blob',
-        headers: axiosInstance.defaults.headers,
       });
       return data;
     },
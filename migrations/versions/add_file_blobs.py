@@ -0,0 +1,75 @@
+"""add content-addressed file blobs
+
+Revision ID: add_file_blobs
+Revises: add_upload_checksums
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_blobs'
+down_revision = 'add_upload_checksums'
+branch_labels = None
+depends_on = None
+
+REFERENCING_TABLES = ('uploaded_files', 'message_attachments')
+
+
+def upgrade() -> None:
+    op.create_table('file_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('storage_path', sa.String(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    # Finds blobs to delete without scanning the whole table
+    op.create_index('idx_file_blobs_unreferenced', 'file_blobs', ['sha256'], postgresql_where=sa.text('ref_count <= 0'))
+
+    for table in REFERENCING_TABLES:
+        op.add_column(table, sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+        op.create_foreign_key(f'{table}_blob_sha256_fkey', table, 'file_blobs', ['blob_sha256'], ['sha256'])
+        op.create_index(op.f(f'ix_{table}_blob_sha256'), table, ['blob_sha256'], unique=False)
+
+    # Reference counts follow inserts, deletes (including cascades) and re-pointing
+    op.execute("""
+        CREATE FUNCTION file_blobs_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                IF OLD.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.blob_sha256;
+                END IF;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                IF NEW.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.blob_sha256;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in REFERENCING_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_blob_refcount
+            AFTER INSERT OR DELETE OR UPDATE OF blob_sha256 ON {table}
+            FOR EACH ROW EXECUTE FUNCTION file_blobs_refcount()
+        """)
+
+
+def downgrade() -> None:
+    for table in REFERENCING_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_blob_refcount ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS file_blobs_refcount()")
+
+    for table in REFERENCING_TABLES:
+        op.drop_index(op.f(f'ix_{table}_blob_sha256'), table_name=table)
+        op.drop_constraint(f'{table}_blob_sha256_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'blob_sha256')
+
+    op.drop_index('idx_file_blobs_unreferenced', table_name='file_blobs')
+    op.drop_table('file_blobs')
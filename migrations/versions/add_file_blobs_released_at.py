@@ -0,0 +1,66 @@
+"""add file blobs released_at
+
+Revision ID: add_file_blobs_released_at
+Revises: add_upload_sessions
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_blobs_released_at'
+down_revision = 'add_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('file_blobs', sa.Column('released_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE file_blobs SET released_at = now() WHERE ref_count <= 0")
+
+    # Same counting as before, also stamping when a blob loses its last reference
+    op.execute("""
+        CREATE OR REPLACE FUNCTION file_blobs_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                IF OLD.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs
+                    SET ref_count = ref_count - 1,
+                        released_at = CASE WHEN ref_count <= 1 THEN now() ELSE released_at END
+                    WHERE sha256 = OLD.blob_sha256;
+                END IF;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                IF NEW.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs
+                    SET ref_count = ref_count + 1, released_at = NULL
+                    WHERE sha256 = NEW.blob_sha256;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION file_blobs_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                IF OLD.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.blob_sha256;
+                END IF;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                IF NEW.blob_sha256 IS NOT NULL THEN
+                    UPDATE file_blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.blob_sha256;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.drop_column('file_blobs', 'released_at')
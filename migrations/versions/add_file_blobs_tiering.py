@@ -0,0 +1,39 @@
+"""add file blobs storage tiers
+
+Revision ID: add_file_blobs_tiering
+Revises: add_storage_usage
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_blobs_tiering'
+down_revision = 'add_storage_usage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('file_blobs', sa.Column('tier', sa.String(length=8), nullable=False, server_default='hot'))
+    op.add_column('file_blobs', sa.Column('compression', sa.String(length=16), nullable=True))
+    op.add_column('file_blobs', sa.Column('stored_size', sa.BigInteger(), nullable=True))
+    op.add_column('file_blobs', sa.Column('last_accessed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('file_blobs', sa.Column('tiered_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Blobs never downloaded count as accessed when stored
+    op.execute("UPDATE file_blobs SET last_accessed_at = coalesce(created_at, now())")
+    op.alter_column('file_blobs', 'last_accessed_at', nullable=False, server_default=sa.text('now()'))
+
+    op.create_index('idx_file_blobs_tier_last_accessed_at', 'file_blobs', ['tier', 'last_accessed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_file_blobs_tier_last_accessed_at', table_name='file_blobs')
+    op.drop_column('file_blobs', 'tiered_at')
+    op.drop_column('file_blobs', 'last_accessed_at')
+    op.drop_column('file_blobs', 'stored_size')
+    op.drop_column('file_blobs', 'compression')
+    op.drop_column('file_blobs', 'tier')
@@ -0,0 +1,38 @@
+"""add form drafts
+
+Revision ID: add_form_drafts
+Revises: add_form_response_revision
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_drafts'
+down_revision = 'add_form_response_revision'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('form_drafts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('user_id', 'form_id', name='uq_form_drafts_user_id_form_id')
+    )
+    op.create_index(op.f('ix_form_drafts_id'), 'form_drafts', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_form_drafts_id'), table_name='form_drafts')
+    op.drop_table('form_drafts')
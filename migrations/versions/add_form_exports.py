@@ -0,0 +1,41 @@
+"""add form exports
+
+Revision ID: add_form_exports
+Revises: add_form_drafts
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_exports'
+down_revision = 'add_form_drafts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('form_exports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('requested_by_id', sa.Integer(), nullable=True),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['requested_by_id'], ['users.id'], ondelete='SET NULL')
+    )
+    op.create_index(op.f('ix_form_exports_id'), 'form_exports', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_form_exports_id'), table_name='form_exports')
+    op.drop_table('form_exports')
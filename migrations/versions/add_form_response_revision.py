@@ -0,0 +1,25 @@
+"""add form response revision
+
+Revision ID: add_form_response_revision
+Revises: add_response_changes
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_response_revision'
+down_revision = 'add_response_changes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A constant default is a catalog-only change, no table rewrite
+    op.add_column('form_responses', sa.Column('revision', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('form_responses', 'revision')
@@ -0,0 +1,44 @@
+"""add typed values table for indexed form fields
+
+Revision ID: add_form_response_values
+Revises: add_form_responses_search
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_response_values'
+down_revision = 'add_form_responses_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('form_response_values',
+        sa.Column('response_id', sa.Integer(), nullable=False),
+        sa.Column('field_id', sa.String(), nullable=False),
+        sa.Column('response_created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('value_text', sa.String(), nullable=True),
+        sa.Column('value_number', sa.Numeric(), nullable=True),
+        sa.Column('value_date', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('response_id', 'field_id'),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(
+            ['response_id', 'response_created_at'],
+            ['form_responses.id', 'form_responses.created_at'],
+            ondelete='CASCADE'
+        )
+    )
+
+    # One B-tree per value type so equality and range filters are index lookups
+    op.create_index('idx_form_response_values_text', 'form_response_values', ['form_id', 'field_id', 'value_text'])
+    op.create_index('idx_form_response_values_number', 'form_response_values', ['form_id', 'field_id', 'value_number'])
+    op.create_index('idx_form_response_values_date', 'form_response_values', ['form_id', 'field_id', 'value_date'])
+
+
+def downgrade() -> None:
+    op.drop_table('form_response_values')
@@ -0,0 +1,54 @@
+"""add full-text search on form responses
+
+Revision ID: add_form_responses_search
+Revises: partition_form_responses
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import os
+import re
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_responses_search'
+down_revision = 'partition_form_responses'
+branch_labels = None
+depends_on = None
+
+SEARCH_LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'simple')
+
+
+def upgrade() -> None:
+    if not re.match(r'^[a-z_]+$', SEARCH_LANGUAGE):
+        raise ValueError(f"Invalid SEARCH_LANGUAGE: {SEARCH_LANGUAGE}")
+
+    # Responses were stored as JSON-encoded strings; unwrap them into real jsonb objects
+    op.execute("""
+        ALTER TABLE form_responses
+        ALTER COLUMN data TYPE jsonb
+        USING CASE
+            WHEN jsonb_typeof(data::jsonb) = 'string' THEN (data::jsonb #>> '{}')::jsonb
+            ELSE data::jsonb
+        END
+    """)
+
+    # Only string values are indexed, so field ids and structure don't pollute results
+    op.execute(f"""
+        ALTER TABLE form_responses
+        ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (jsonb_to_tsvector('{SEARCH_LANGUAGE}'::regconfig, data, '["string"]')) STORED
+    """)
+
+    # btree_gin lets a single GIN index serve both the form_id filter and the text match
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.execute("""
+        CREATE INDEX idx_form_responses_search
+        ON form_responses USING gin (form_id, search_vector)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_form_responses_search")
+    op.execute("ALTER TABLE form_responses DROP COLUMN search_vector")
+    op.execute("ALTER TABLE form_responses ALTER COLUMN data TYPE text USING data::text")
@@ -0,0 +1,24 @@
+"""add form snapshot hash
+
+Revision ID: add_form_snapshot_hash
+Revises: allow_anonymous_responses
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_snapshot_hash'
+down_revision = 'allow_anonymous_responses'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('forms', sa.Column('snapshot_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('forms', 'snapshot_hash')
@@ -0,0 +1,48 @@
+"""add immutable form versions
+
+Revision ID: add_form_versions
+Revises: add_form_response_values
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_form_versions'
+down_revision = 'add_form_response_values'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('form_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('fields', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('form_id', 'version', name='uq_form_versions_form_id_version')
+    )
+    op.create_index(op.f('ix_form_versions_id'), 'form_versions', ['id'], unique=False)
+
+    op.add_column('forms', sa.Column('current_version', sa.Integer(), nullable=False, server_default='1'))
+    # Existing responses keep a NULL version: the schema they were submitted under is unknown
+    op.add_column('form_responses', sa.Column('form_version', sa.Integer(), nullable=True))
+
+    # The current fields of every form become its first version
+    op.execute("""
+        INSERT INTO form_versions (form_id, version, fields, created_at)
+        SELECT id, 1, fields, COALESCE(updated_at, created_at, now())
+        FROM forms
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('form_responses', 'form_version')
+    op.drop_column('forms', 'current_version')
+    op.drop_index(op.f('ix_form_versions_id'), table_name='form_versions')
+    op.drop_table('form_versions')
@@ -0,0 +1,28 @@
+"""add idempotency key leases
+
+Revision ID: add_idempotency_key_leases
+Revises: add_pdf_cache
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_idempotency_key_leases'
+down_revision = 'add_pdf_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('idempotency_keys', sa.Column('lock_token', sa.String(length=32), nullable=True))
+    # Requests in progress during the upgrade cannot renew a lease: let retries take them over
+    op.execute("UPDATE idempotency_keys SET locked_until = now() WHERE status_code IS NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'lock_token')
+    op.drop_column('idempotency_keys', 'locked_until')
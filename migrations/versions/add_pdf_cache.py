@@ -0,0 +1,32 @@
+"""add pdf render cache
+
+Revision ID: add_pdf_cache
+Revises: add_file_blobs_tiering
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_pdf_cache'
+down_revision = 'add_file_blobs_tiering'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('pdf_cache',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('last_accessed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('digest')
+    )
+    op.create_index(op.f('ix_pdf_cache_last_accessed_at'), 'pdf_cache', ['last_accessed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pdf_cache_last_accessed_at'), table_name='pdf_cache')
+    op.drop_table('pdf_cache')
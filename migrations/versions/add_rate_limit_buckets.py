@@ -0,0 +1,31 @@
+"""add shared rate limit buckets
+
+Revision ID: add_rate_limit_buckets
+Revises: add_idempotency_key_leases
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_rate_limit_buckets'
+down_revision = 'add_idempotency_key_leases'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+        sa.Column('key', sa.String(length=128), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    # Written on every limited request and worthless after a crash: skip the WAL
+    op.execute("ALTER TABLE rate_limit_buckets SET UNLOGGED")
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,37 @@
+"""add response change outbox
+
+Revision ID: add_response_changes
+Revises: add_form_snapshot_hash
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_response_changes'
+down_revision = 'add_form_snapshot_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('response_changes',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default=sa.text('txid_current()'), nullable=False),
+        sa.Column('response_id', sa.Integer(), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('site_id', sa.Integer(), nullable=True),
+        sa.Column('operation', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_response_changes_txid_id', 'response_changes', ['txid', 'id'])
+    op.create_index('idx_response_changes_response_id', 'response_changes', ['response_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('response_changes')
@@ -0,0 +1,123 @@
+"""add storage usage accounting
+
+Revision ID: add_storage_usage
+Revises: add_file_blobs_released_at
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_storage_usage'
+down_revision = 'add_file_blobs_released_at'
+branch_labels = None
+depends_on = None
+
+FILE_TABLES = ('uploaded_files', 'message_attachments')
+
+
+def upgrade() -> None:
+    for table in FILE_TABLES:
+        op.add_column(table, sa.Column('user_id', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('site_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(f'{table}_user_id_fkey', table, 'users', ['user_id'], ['id'], ondelete='SET NULL')
+        op.create_foreign_key(f'{table}_site_id_fkey', table, 'sites', ['site_id'], ['id'], ondelete='SET NULL')
+        # Per-user file listings, newest first, paginated by id
+        op.create_index(f'idx_{table}_user_id_id', table, ['user_id', 'id'], unique=False)
+
+    op.execute("""
+        UPDATE uploaded_files f
+        SET user_id = r.user_id, site_id = fo.site_id
+        FROM form_responses r JOIN forms fo ON fo.id = r.form_id
+        WHERE r.id = f.form_response_id
+    """)
+    op.execute("""
+        UPDATE message_attachments a
+        SET user_id = m.sender_id, site_id = u.site_id
+        FROM messages m JOIN users u ON u.id = m.sender_id
+        WHERE m.id = a.message_id
+    """)
+
+    op.create_table('storage_usage',
+        sa.Column('scope', sa.String(length=8), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('files', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quota_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('scope', 'owner_id')
+    )
+    op.execute("""
+        INSERT INTO storage_usage (scope, owner_id, bytes, files)
+        SELECT scope, owner_id, sum(bytes), sum(files)
+        FROM (
+            SELECT 'user' AS scope, user_id AS owner_id, coalesce(sum(size), 0) AS bytes, count(*) AS files
+            FROM uploaded_files WHERE user_id IS NOT NULL GROUP BY user_id
+            UNION ALL
+            SELECT 'user', user_id, coalesce(sum(size), 0), count(*)
+            FROM message_attachments WHERE user_id IS NOT NULL GROUP BY user_id
+            UNION ALL
+            SELECT 'site', site_id, coalesce(sum(size), 0), count(*)
+            FROM uploaded_files WHERE site_id IS NOT NULL GROUP BY site_id
+            UNION ALL
+            SELECT 'site', site_id, coalesce(sum(size), 0), count(*)
+            FROM message_attachments WHERE site_id IS NOT NULL GROUP BY site_id
+        ) usage
+        GROUP BY scope, owner_id
+    """)
+
+    # Counters follow inserts, deletes (including cascades) and changes of size or owner
+    op.execute("""
+        CREATE FUNCTION storage_usage_add(usage_scope varchar, usage_owner integer, delta_bytes bigint, delta_files integer)
+        RETURNS void AS $$
+        BEGIN
+            IF usage_owner IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO storage_usage (scope, owner_id, bytes, files)
+            VALUES (usage_scope, usage_owner, delta_bytes, delta_files)
+            ON CONFLICT (scope, owner_id) DO UPDATE
+            SET bytes = storage_usage.bytes + delta_bytes,
+                files = storage_usage.files + delta_files,
+                updated_at = now();
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION storage_usage_track() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM storage_usage_add('user', OLD.user_id, -coalesce(OLD.size, 0), -1);
+                PERFORM storage_usage_add('site', OLD.site_id, -coalesce(OLD.size, 0), -1);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM storage_usage_add('user', NEW.user_id, coalesce(NEW.size, 0), 1);
+                PERFORM storage_usage_add('site', NEW.site_id, coalesce(NEW.size, 0), 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in FILE_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_storage_usage
+            AFTER INSERT OR DELETE OR UPDATE OF size, user_id, site_id ON {table}
+            FOR EACH ROW EXECUTE FUNCTION storage_usage_track()
+        """)
+
+
+def downgrade() -> None:
+    for table in FILE_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_storage_usage ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS storage_usage_track()")
+    op.execute("DROP FUNCTION IF EXISTS storage_usage_add(varchar, integer, bigint, integer)")
+    op.drop_table('storage_usage')
+
+    for table in FILE_TABLES:
+        op.drop_index(f'idx_{table}_user_id_id', table_name=table)
+        op.drop_constraint(f'{table}_site_id_fkey', table, type_='foreignkey')
+        op.drop_constraint(f'{table}_user_id_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'site_id')
+        op.drop_column(table, 'user_id')
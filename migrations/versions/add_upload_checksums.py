@@ -0,0 +1,28 @@
+"""add upload size and checksum
+
+Revision ID: add_upload_checksums
+Revises: add_form_responses_time_indexes
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_upload_checksums'
+down_revision = 'add_form_responses_time_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ('uploaded_files', 'message_attachments'):
+        op.add_column(table, sa.Column('size', sa.BigInteger(), nullable=True))
+        op.add_column(table, sa.Column('checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ('uploaded_files', 'message_attachments'):
+        op.drop_column(table, 'checksum')
+        op.drop_column(table, 'size')
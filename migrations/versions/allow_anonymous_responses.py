@@ -0,0 +1,25 @@
+"""allow anonymous form responses
+
+Revision ID: allow_anonymous_responses
+Revises: add_form_versions
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'allow_anonymous_responses'
+down_revision = 'add_form_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Submissions through a public form link have no user
+    op.alter_column('form_responses', 'user_id', nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM form_responses WHERE user_id IS NULL")
+    op.alter_column('form_responses', 'user_id', nullable=False)
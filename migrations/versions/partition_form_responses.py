@@ -0,0 +1,128 @@
+"""partition form responses by month
+
+Revision ID: partition_form_responses
+Revises: add_last_login_field
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_form_responses'
+down_revision = 'add_last_login_field'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Unique constraints on a partitioned table must include the partition key,
+    # so uploaded_files can no longer hold a foreign key on form_responses.id alone
+    op.drop_constraint('uploaded_files_form_response_id_fkey', 'uploaded_files', type_='foreignkey')
+
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE form_responses_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE form_responses RENAME TO form_responses_unpartitioned")
+    op.execute("ALTER INDEX form_responses_pkey RENAME TO form_responses_unpartitioned_pkey")
+    op.execute("""
+        UPDATE form_responses_unpartitioned
+        SET created_at = COALESCE(updated_at, now())
+        WHERE created_at IS NULL
+    """)
+
+    op.execute("""
+        CREATE TABLE form_responses (
+            LIKE form_responses_unpartitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id, created_at),
+            FOREIGN KEY (form_id) REFERENCES forms(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE form_responses_id_seq OWNED BY form_responses.id")
+
+    # Create one partition per calendar month (UTC)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_form_responses_partition(month_start date)
+        RETURNS text AS
+        $$
+        DECLARE
+            partition_name text := 'form_responses_' || to_char(month_start, 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF form_responses FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                month_start::timestamp AT TIME ZONE 'UTC',
+                (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Create partitions for the current month and the next `months_ahead` months
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ensure_form_responses_partitions(months_ahead integer)
+        RETURNS integer AS
+        $$
+        DECLARE
+            current_month date := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+            i integer;
+        BEGIN
+            FOR i IN 0..months_ahead LOOP
+                PERFORM create_form_responses_partition((current_month + make_interval(months => i))::date);
+            END LOOP;
+            RETURN months_ahead + 1;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Partitions covering existing data, then the upcoming months
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start date;
+        BEGIN
+            FOR month_start IN
+                SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date
+                FROM form_responses_unpartitioned
+            LOOP
+                PERFORM create_form_responses_partition(month_start);
+            END LOOP;
+        END;
+        $$;
+    """)
+    op.execute("SELECT ensure_form_responses_partitions(3)")
+
+    op.execute("INSERT INTO form_responses SELECT * FROM form_responses_unpartitioned")
+    op.drop_table('form_responses_unpartitioned')
+
+    op.create_index('idx_form_responses_form_id', 'form_responses', ['form_id'])
+    op.create_index('idx_form_responses_user_id', 'form_responses', ['user_id'])
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE form_responses_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE form_responses RENAME TO form_responses_partitioned")
+    op.execute("ALTER INDEX form_responses_pkey RENAME TO form_responses_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE form_responses (
+            LIKE form_responses_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id),
+            FOREIGN KEY (form_id) REFERENCES forms(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("ALTER TABLE form_responses ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER SEQUENCE form_responses_id_seq OWNED BY form_responses.id")
+    op.execute("INSERT INTO form_responses SELECT * FROM form_responses_partitioned")
+    op.execute("DROP TABLE form_responses_partitioned")
+
+    op.execute("DROP FUNCTION IF EXISTS ensure_form_responses_partitions(integer)")
+    op.execute("DROP FUNCTION IF EXISTS create_form_responses_partition(date)")
+
+    op.create_index('idx_form_responses_form_id', 'form_responses', ['form_id'])
+    op.create_index('idx_form_responses_user_id', 'form_responses', ['user_id'])
+    op.create_foreign_key(
+        'uploaded_files_form_response_id_fkey', 'uploaded_files', 'form_responses',
+        ['form_response_id'], ['id'], ondelete='CASCADE'
+    )
@@ -17,5 +17,7 @@ setup(
         "jinja2==3.1.2",
         "python-dotenv==1.0.0",
         "reportlab==4.0.7",
+        "pyarrow==14.0.1",
+        "Pillow==10.1.0",
     ],
 )
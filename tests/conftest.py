@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+sys.path.insert(0, ROOT)
+
+# The app reads DATABASE_URL at import time; nothing connects until a test asks for it
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL or "postgresql://localhost/unused")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Engine on TEST_DATABASE_URL, an empty database migrated to head for the session."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from sqlalchemy import create_engine
+
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": TEST_DATABASE_URL},
+        check=True
+    )
+    engine = create_engine(TEST_DATABASE_URL)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def connection(engine):
+    """Connection in a transaction rolled back after the test."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
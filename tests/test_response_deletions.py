@@ -0,0 +1,95 @@
+"""Deleting a form, site or user removes its responses as the change feed says (needs TEST_DATABASE_URL)."""
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+import pytest
+
+from backend.app.models import Form, FormResponse, ResponseChange, Site, User, UploadedFile
+from backend.app.services.responses import create_form_response, delete_responses
+
+
+@pytest.fixture
+def db(connection):
+    session = Session(bind=connection)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def responses(db):
+    """Two sites with a form each, answered by two users; returns their ids."""
+    db.execute(text("SELECT ensure_form_responses_partitions(0)"))
+    ids = {}
+    for site in ("a", "b"):
+        ids[f"site_{site}"] = db.execute(text(
+            "INSERT INTO sites (name, subdomain) VALUES (:name, :name) RETURNING id"
+        ), {"name": f"deletions-{site}"}).scalar()
+        ids[f"form_{site}"] = db.execute(text(
+            "INSERT INTO forms (title, fields, site_id) VALUES ('Form', '[]', :site_id) RETURNING id"
+        ), {"site_id": ids[f"site_{site}"]}).scalar()
+    for user in ("a", "b"):
+        # Role written as stored by the migration
+        ids[f"user_{user}"] = db.execute(text("""
+            INSERT INTO users (email, username, hashed_password, is_active, role)
+            VALUES (:name || '@example.com', :name, 'x', true, 'user') RETURNING id
+        """), {"name": f"deletions-{user}"}).scalar()
+
+    for site in ("a", "b"):
+        for user in ("a", "b"):
+            response = create_form_response(
+                db, ids[f"form_{site}"], ids[f"site_{site}"], None, [], ids[f"user_{user}"], {"site": site}
+            )
+            db.add(UploadedFile(
+                filename=f"{response.id}.txt",
+                original_filename="file.txt",
+                file_path=f"/tmp/{response.id}.txt",
+                form_response_id=response.id
+            ))
+    db.flush()
+    return ids
+
+
+def _feed(db, response_ids):
+    """Responses the change feed says exist, replaying its events in order."""
+    alive = set()
+    changes = db.query(ResponseChange).filter(ResponseChange.response_id.in_(response_ids)).order_by(ResponseChange.id)
+    for change in changes:
+        if change.operation == "delete":
+            alive.discard(change.response_id)
+        else:
+            alive.add(change.response_id)
+    return alive
+
+
+@pytest.mark.parametrize("target", ["form", "site", "user"])
+def test_feed_matches_table_after_delete(db, responses, target):
+    response_ids = [response_id for (response_id,) in db.query(FormResponse.id).filter(
+        FormResponse.form_id.in_([responses["form_a"], responses["form_b"]])
+    )]
+    assert len(response_ids) == 4
+
+    if target == "form":
+        form = db.get(Form, responses["form_a"])
+        # Loaded children are not nulled by the ORM either
+        assert len(form.responses) == 2
+        delete_responses(db, FormResponse.form_id == form.id)
+        db.delete(form)
+    elif target == "site":
+        delete_responses(db, Form.site_id == responses["site_a"])
+        db.execute(delete(Site).where(Site.id == responses["site_a"]))
+    else:
+        delete_responses(db, FormResponse.user_id == responses["user_a"])
+        db.execute(delete(User).where(User.id == responses["user_a"]))
+    db.flush()
+    db.expire_all()
+
+    remaining = {response_id for (response_id,) in db.query(FormResponse.id).filter(FormResponse.id.in_(response_ids))}
+    assert len(remaining) == 2
+    assert _feed(db, response_ids) == remaining
+    # Nothing orphaned with a NULL key either
+    assert not db.query(FormResponse).filter(
+        FormResponse.id.in_(response_ids),
+        (FormResponse.form_id.is_(None)) | (FormResponse.user_id.is_(None))
+    ).count()
+    files = {file_row.form_response_id for file_row in db.query(UploadedFile).filter(UploadedFile.form_response_id.in_(response_ids))}
+    assert files == remaining
@@ -0,0 +1,85 @@
+"""Planner choices for created_at windows on form_responses (needs TEST_DATABASE_URL)."""
+from sqlalchemy import text
+import json
+
+import pytest
+
+FORMS = 100
+RESPONSES = 200000
+
+
+@pytest.fixture
+def responses(connection):
+    """100 forms with 200k responses appended over April and May 2024, analyzed."""
+    site_id = connection.execute(text(
+        "INSERT INTO sites (name, subdomain) VALUES ('Planner', 'planner') RETURNING id"
+    )).scalar()
+    connection.execute(text("""
+        INSERT INTO forms (title, fields, site_id)
+        SELECT 'Form ' || i, '[]', :site_id FROM generate_series(1, :forms) AS i
+    """), {"site_id": site_id, "forms": FORMS})
+    connection.execute(text("SELECT create_form_responses_partition('2024-04-01')"))
+    connection.execute(text("SELECT create_form_responses_partition('2024-05-01')"))
+    # Inserted in created_at order, like live traffic
+    connection.execute(text("""
+        WITH site_forms AS (SELECT array_agg(id ORDER BY id) AS ids FROM forms WHERE site_id = :site_id)
+        INSERT INTO form_responses (form_id, data, created_at)
+        SELECT site_forms.ids[1 + i % :forms], '{}'::jsonb,
+               timestamptz '2024-04-01 00:00:00+00' + i * (interval '61 days' / :responses)
+        FROM site_forms, generate_series(0, :responses - 1) AS i
+    """), {"site_id": site_id, "forms": FORMS, "responses": RESPONSES})
+    connection.execute(text("ANALYZE form_responses"))
+    form_id = connection.execute(text("SELECT min(id) FROM forms WHERE site_id = :site_id"), {"site_id": site_id}).scalar()
+    return form_id
+
+
+def _plan_nodes(connection, query, params):
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = []
+    pending = [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get("Plans", []))
+    return nodes
+
+
+def _partition_indexes(connection, name):
+    """Names of the per-partition indexes of a partitioned index."""
+    return set(connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = :name
+    """), {"name": name}).scalars())
+
+
+def test_form_window_uses_composite_index(connection, responses):
+    nodes = _plan_nodes(connection, """
+        SELECT * FROM form_responses
+        WHERE form_id = :form_id AND created_at >= :start AND created_at < :end
+        ORDER BY created_at DESC, id DESC
+        LIMIT 50
+    """, {"form_id": responses, "start": "2024-05-20T00:00:00Z", "end": "2024-05-27T00:00:00Z"})
+
+    assert not [node for node in nodes if node["Node Type"] == "Seq Scan"]
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    assert used
+    assert used <= _partition_indexes(connection, "idx_form_responses_form_id_created_at")
+    # Only the May partition is scanned
+    assert {node["Relation Name"] for node in nodes if "Relation Name" in node} == {"form_responses_2024_05"}
+
+
+def test_cross_form_window_uses_brin_index(connection, responses):
+    nodes = _plan_nodes(connection, """
+        SELECT count(*) FROM form_responses
+        WHERE created_at >= :start AND created_at < :end
+    """, {"start": "2024-05-20T00:00:00Z", "end": "2024-05-21T00:00:00Z"})
+
+    assert not [node for node in nodes if node["Node Type"] == "Seq Scan"]
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    assert used
+    assert used <= _partition_indexes(connection, "idx_form_responses_created_at_brin")
@@ -0,0 +1,136 @@
+"""Storage drivers: the local filesystem and S3 against a local moto server."""
+from urllib.request import urlopen
+import socket
+import uuid
+
+import pytest
+
+from backend.app.services.storage import LocalStorage, S3Storage, Storage
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """URL of a moto server standing in for S3."""
+    moto_server = pytest.importorskip("moto.server")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path) -> Storage:
+    if request.param == "local":
+        return LocalStorage(str(tmp_path / "store"))
+
+    pytest.importorskip("boto3")
+    endpoint = request.getfixturevalue("s3_endpoint")
+    bucket = f"test-{uuid.uuid4().hex}"
+    storage = S3Storage(
+        bucket=bucket,
+        prefix="app",
+        endpoint_url=endpoint,
+        region="us-east-1",
+        access_key_id="testing",
+        secret_access_key="testing"
+    )
+    storage.client.create_bucket(Bucket=bucket)
+    return storage
+
+
+@pytest.fixture
+def staged(tmp_path):
+    """Write a file to stage, return its path."""
+    def stage(content: bytes) -> str:
+        path = tmp_path / f"staged-{uuid.uuid4().hex}"
+        path.write_bytes(content)
+        return str(path)
+    return stage
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_put_open_consumes_source(storage, staged):
+    source = staged(b"hello")
+    storage.put("blobs/ab/cd/abcd", source)
+
+    with pytest.raises(FileNotFoundError):
+        open(source, "rb")
+    with storage.open("blobs/ab/cd/abcd") as stored:
+        assert stored.read() == b"hello"
+        stored.seek(1)
+        assert stored.read(2) == b"el"
+
+
+def test_put_replaces(storage, staged):
+    storage.put("pdfs/a.pdf", staged(b"first"))
+    storage.put("pdfs/a.pdf", staged(b"second"))
+    with storage.open("pdfs/a.pdf") as stored:
+        assert stored.read() == b"second"
+
+
+def test_missing_key(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.open("blobs/00/00/missing")
+    assert storage.stat("blobs/00/00/missing") is None
+    assert not storage.exists("blobs/00/00/missing")
+    # Deleting a missing key is not an error
+    storage.delete("blobs/00/00/missing")
+
+
+def test_stat(storage, staged):
+    storage.put("blobs/ab/cd/abcd", staged(b"12345"))
+    stored = storage.stat("blobs/ab/cd/abcd")
+    assert stored.key == "blobs/ab/cd/abcd"
+    assert stored.size == 5
+    assert stored.modified > 0
+    assert storage.exists("blobs/ab/cd/abcd")
+
+
+def test_delete(storage, staged):
+    storage.put("blobs/ab/cd/abcd", staged(b"x"))
+    storage.delete("blobs/ab/cd/abcd")
+    assert not storage.exists("blobs/ab/cd/abcd")
+
+
+def test_list_by_prefix(storage, staged):
+    keys = [
+        "blobs/ab/cd/abcd",
+        "blobs/ab/cd/abcd.thumbnail.webp",
+        "blobs/ab/ef/abef",
+        "blobs/12/34/1234",
+        "pdfs/a.pdf",
+    ]
+    for key in keys:
+        storage.put(key, staged(key.encode()))
+
+    assert sorted(item.key for item in storage.list()) == sorted(keys)
+    assert sorted(item.key for item in storage.list("blobs/ab/")) == [
+        "blobs/ab/cd/abcd", "blobs/ab/cd/abcd.thumbnail.webp", "blobs/ab/ef/abef"
+    ]
+    assert [item.key for item in storage.list("blobs/ab/cd/abcd.")] == ["blobs/ab/cd/abcd.thumbnail.webp"]
+    assert [item.key for item in storage.list("pdf")] == ["pdfs/a.pdf"]
+    assert list(storage.list("exports/")) == []
+    assert {item.key: item.size for item in storage.list("pdfs/")} == {"pdfs/a.pdf": len(b"pdfs/a.pdf")}
+
+
+def test_presigned_url(storage, staged):
+    storage.put("blobs/ab/cd/abcd", staged(b"content"))
+    url = storage.presigned_url("blobs/ab/cd/abcd", "report été.pdf", "application/pdf", expires=60)
+
+    if storage.local:
+        # Served by the API itself
+        assert url is None
+        assert storage.path("blobs/ab/cd/abcd").endswith("blobs/ab/cd/abcd")
+        return
+    assert storage.path("blobs/ab/cd/abcd") is None
+    with urlopen(url) as response:
+        assert response.read() == b"content"
+        assert response.headers["Content-Type"] == "application/pdf"
+        assert "filename*=utf-8''report%20%C3%A9t%C3%A9.pdf" in response.headers["Content-Disposition"]